@@ -1,15 +1,32 @@
 import argparse
+import asyncio
+import glob
+import hashlib
 import itertools
 import logging
+import math
+import mmap
 import multiprocessing
+import multiprocessing.connection
+import os
 from  multiprocessing import shared_memory
 import numpy as np
-import random
+import resource
+import socket
+import stat
+import struct
+import tempfile
+import threading
 import time
 import yaml
+import zlib
 import json
 import sys
 import csv
+import ctypes
+import ctypes.util
+import concurrent.futures
+import fcntl
 from datetime import datetime
 
 try:
@@ -17,6 +34,123 @@ try:
 except ImportError:
     posix_ipc = None
 
+try:
+    libatomic = ctypes.CDLL(ctypes.util.find_library('atomic') or 'libatomic.so.1')
+    atomic_exchange = libatomic.__atomic_exchange_8
+    atomic_exchange.argtypes = (ctypes.c_void_p, ctypes.c_int64, ctypes.c_int)
+    atomic_exchange.restype = ctypes.c_int64
+except OSError:
+    libatomic = atomic_exchange = None
+
+# Per-worker sample rings hold raw perf_counter_ns (start, end) pairs
+SAMPLE_FIELDS = 2
+# Upper bound on the message rate used to size rings for --duration runs
+MAX_SAMPLES_PER_SECOND = 1000000
+# Cap per-worker ring capacity (16 bytes per slot, 64 MB per worker)
+MAX_SAMPLE_CAPACITY = 1 << 22
+# Workers fold their sample ring into the histogram this many samples at a time, about a millisecond of work
+HISTOGRAM_FOLD_SAMPLES = 1 << 15
+# Latency histograms track values up to 2**53 ns, the range where float64 bit lengths are exact
+HISTOGRAM_MAX_BITS = 53
+# Percentiles reported from the latency histograms
+HISTOGRAM_PERCENTILES = (50, 90, 99, 99.9, 99.99)
+# Each worker keeps a steady-state and a warmup latency histogram; thread and asyncio
+# worker processes also record scheduling lag in the row of their first worker
+STEADY_STATE, WARMUP, SCHEDULING = range(3)
+HISTOGRAM_KINDS = 3
+# SPSC message rings: head, tail and closed flag each sit on their own cache line
+CACHE_LINE = 64
+RING_HEADER_BYTES = 3 * CACHE_LINE
+RING_SLOTS = 64
+# Busy-wait iterations before a blocked ring end yields its CPU
+SPIN_LIMIT = 1000
+# Broadcast slots carry their sequence number and publish timestamp ahead of the payload
+BROADCAST_SLOT_HEADER = 16
+# MPMC queue header: finished producer count, enqueue spin lock and dequeue spin lock, a cache line each
+QUEUE_HEADER_BYTES = 3 * CACHE_LINE
+# Transports whose ends asyncio can wrap in streams
+ASYNCIO_TRANSPORTS = ('pipe', 'unix-stream', 'tcp')
+# Seconds between scheduling lag probes of thread and asyncio worker processes
+PROBE_INTERVAL = 0.001
+# Probe lags are folded into the histogram in batches; the idle oversleep is the median of PROBE_CALIBRATION sleeps
+PROBE_BATCH = 256
+PROBE_CALIBRATION = 20
+# AF_UNIX datagrams may use the socket's send buffer less this many bytes the kernel reserves
+UNIX_DGRAM_OVERHEAD = 32
+# Per-message size limit for unprivileged posix message queues
+MQUEUE_MSGSIZE_MAX = '/proc/sys/fs/mqueue/msgsize_max'
+# Where --backing hugetlbfs creates its file unless --backing_dir says otherwise
+HUGETLBFS_MOUNT = '/dev/hugepages'
+# __ATOMIC_SEQ_CST for libatomic calls
+ATOMIC_SEQ_CST = 5
+# Per-worker counters kept next to the sample rings
+STAT_MESSAGES, STAT_DROPPED, STAT_STALLS, STAT_STALL_NS, STAT_FIRST_STALL, STAT_VERIFIED, STAT_CORRUPT = range(7)
+# Updated on every message for live telemetry: messages recorded so far and whether warmup is still running
+STAT_LIVE_COUNT, STAT_LIVE_WARMUP = range(7, 9)
+# Nanoseconds an MPMC producer or consumer spent waiting for the queue lock
+STAT_LOCK_WAIT_NS = 9
+# perf_counter_ns at which a publisher or producer left warmup; receivers end their warmup on it
+STAT_WARMUP_END_NS = 10
+# perf_counter_ns at which a recording worker received its first and last steady-state message
+STAT_STEADY_FIRST_NS, STAT_STEADY_LAST_NS = range(11, 13)
+WORKER_STAT_FIELDS = 13
+# Seconds between live telemetry samples
+TELEMETRY_INTERVAL = 1
+# Seconds between the sample blocks the parent streams to the results store during a run
+SPOOL_INTERVAL = 1
+# Payloads are pre-generated once and rotated; the pool holds up to this many
+# messages but never more than PAYLOAD_POOL_BYTES
+PAYLOAD_POOL_SIZE = 16
+PAYLOAD_POOL_BYTES = 16 * 1024 * 1024
+
+# Defaults for options that older YAML configs do not list
+CONFIG_DEFAULTS = {
+    'backpressure': False,
+    'transport': 'shm',
+    'histogram_precision': 3,
+    'cpu_list': None,
+    'pin_strategy': 'none',
+    'numa_node': None,
+    'warmup': None,
+    'mlock': False,
+    'message_size_sweep': None,
+    'verify': False,
+    'results_store': 'ipc_benchmark_results.bin',
+    'telemetry': False,
+    'telemetry_file': None,
+    'telemetry_socket': None,
+    'producers': None,
+    'lock': 'spin',
+    'backing': 'shm',
+    'backing_dir': None,
+    'hugepages': False,
+    'worker_model': 'process',
+    'threads_per_process': None,
+    'tasks_per_loop': None,
+}
+# Binary multiples accepted in sizes such as "16M"
+SIZE_SUFFIXES = {'K': 1024, 'M': 1024 * 1024, 'G': 1024 * 1024 * 1024}
+# A cache knee is where the latency per extra byte grows at least this much
+KNEE_SLOPE_FACTOR = 1.5
+# The bandwidth knee is the first size reaching this fraction of peak throughput
+BANDWIDTH_KNEE_FRACTION = 0.9
+# Latency samples per configuration kept by compare, subsampled beyond this
+COMPARE_MAX_SAMPLES = 100000
+# Samples compare reads from a stored column at a time
+COMPARE_CHUNK_SAMPLES = 1 << 20
+# compare's exit status when nothing could be compared: no configuration matched, or one has no samples
+COMPARE_INCOMPLETE_STATUS = 2
+# Options that do not change results and so are left out of sweep config hashes; sweep_cpus holds the
+# CPUs a parallel sweep packed a permutation onto, which differ between otherwise identical runs
+SWEEP_IGNORED_OPTIONS = ('log_file', 'human_readable', 'output_json', 'results_store', 'telemetry', 'telemetry_file',
+                         'telemetry_socket', 'sweep_cpus')
+# Results store layout: the magic, then records of (kind, 16 character key,
+# payload length) headers each followed by a payload padded to 8 bytes
+STORE_MAGIC = b'IPCBRES1'
+RECORD_HEADER = struct.Struct('<4s16s4xQ')
+# Run options header, per-run summary, column block and aggregate summary records
+RECORD_OPTIONS, RECORD_SUMMARY, RECORD_COLUMNS, RECORD_AGGREGATE = b'OPTS', b'SUMM', b'COLS', b'AGGR'
+
 def print_table(log_data):
     process_ids = sorted(set(entry['process_id'] for entry in log_data))
     header = ["Time"]
@@ -30,13 +164,12 @@ def print_table(log_data):
     current_row = None
 
     for entry in log_data:
-        timestamp = entry['capture_time']
-        dt_timestamp = datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')
-        current_entry_second = dt_timestamp.strftime('%Y-%m-%dT%H:%M:%S')
+        # Entries are already grouped by second, so the formatted capture time is the row key
+        current_entry_second = entry['capture_time']
 
         if current_second is None:
             current_second = current_entry_second
-            current_row = [datetime.utcfromtimestamp(dt_timestamp.timestamp()).strftime('%Y-%m-%dT%H:%M:%S')]
+            current_row = [current_entry_second]
 
         if current_entry_second == current_second:
             process_id = entry['process_id']
@@ -51,7 +184,7 @@ def print_table(log_data):
 
             # Start a new row for the next second
             current_second = current_entry_second
-            current_row = [datetime.utcfromtimestamp(dt_timestamp.timestamp()).strftime('%Y-%m-%dT%H:%M:%S')]
+            current_row = [current_entry_second]
             
             process_id = entry['process_id']
             latency = entry['latency']
@@ -64,268 +197,2372 @@ def print_table(log_data):
     print(','.join(map(str, current_row)))
 
             
-def ipc_worker(data, process_id, message_size, message_pattern, args, timestamps):
+def records_samples(args, process_id):
+    """Whether a worker records latency samples: request-response clients, subscribers and mpmc consumers."""
+    if args.message_pattern == "request-response":
+        return process_id % 2 == 0
+    if args.message_pattern == "mpmc":
+        return process_id >= mpmc_producers(args)
+    return process_id > 0
+
+def format_statistic(value, spec):
+    """Counts print as integers, measurements with the given format spec."""
+    return str(value) if isinstance(value, (int, np.integer)) else format(value, spec)
+
+def sample_capacities(args):
+    """Number of (start, end) sample slots to preallocate for each worker; 0 for workers that record none."""
+    capacities = []
+    if args.message_count:
+        capacities.append(args.message_count)
+    if args.duration:
+        capacities.append(args.duration * MAX_SAMPLES_PER_SECOND)
+    if not capacities:
+        raise ValueError("Both duration and num_messages cannot be 0. Specify a positive value for at least one of them.")
+    capacity = max(1, min(min(capacities), MAX_SAMPLE_CAPACITY))
+    return [capacity if records_samples(args, process_id) else 0 for process_id in range(args.process_count)]
+
+def create_sample_buffers(capacities, buckets):
+    # Layout: int64 sample counters [num_processes], int64 worker stats [num_processes, WORKER_STAT_FIELDS],
+    # int64 latency histograms [HISTOGRAM_KINDS, num_processes, buckets], then each worker's int64 samples [capacity, 2]
+    words = len(capacities) * (1 + WORKER_STAT_FIELDS + HISTOGRAM_KINDS * buckets) + sum(capacities) * SAMPLE_FIELDS
+    return multiprocessing.shared_memory.SharedMemory(create=True, size=words * np.dtype(np.int64).itemsize)
+
+def attach_sample_buffers(sample_memory, capacities, buckets):
+    num_processes = len(capacities)
+    counts = np.ndarray((num_processes,), dtype=np.int64, buffer=sample_memory.buf)
+    stats = np.ndarray((num_processes, WORKER_STAT_FIELDS), dtype=np.int64,
+                       buffer=sample_memory.buf, offset=counts.nbytes)
+    # Indexed [STEADY_STATE, WARMUP or SCHEDULING, process]
+    histograms = np.ndarray((HISTOGRAM_KINDS, num_processes, buckets), dtype=np.int64,
+                            buffer=sample_memory.buf, offset=counts.nbytes + stats.nbytes)
+    # One ring per worker, empty for workers that record no samples
+    samples = []
+    offset = counts.nbytes + stats.nbytes + histograms.nbytes
+    for capacity in capacities:
+        samples.append(np.ndarray((capacity, SAMPLE_FIELDS), dtype=np.int64, buffer=sample_memory.buf, offset=offset))
+        offset += samples[-1].nbytes
+    return counts, stats, histograms, samples
+
+def histogram_bits(precision):
+    """Sub-bucket bits that keep `precision` significant decimal digits, as in HdrHistogram."""
+    return math.ceil(math.log2(2 * 10 ** precision))
+
+def histogram_buckets(bits):
+    return (HISTOGRAM_MAX_BITS + 2 - bits) << (bits - 1)
+
+def record_latencies(histogram, pairs, bits):
+    """Add the latencies of (start_ns, end_ns) pairs to a log-linear histogram.
+
+    Values below 2**bits get one bucket each. Above that every power of two
+    is split into 2**(bits - 1) equal sub-buckets, so the bucket index is
+    shift * 2**(bits - 1) + (value >> shift).
+    """
+    values = np.clip(pairs[:, 1] - pairs[:, 0], 0, (1 << HISTOGRAM_MAX_BITS) - 1)
+    shift = np.maximum(np.frexp(values)[1] - bits, 0).astype(np.int64)
+    index = (shift << (bits - 1)) + (values >> shift)
+    histogram += np.bincount(index, minlength=len(histogram))
+
+def histogram_values(index, bits):
+    """Highest value (ns) that falls in each bucket index."""
+    half = 1 << (bits - 1)
+    shift = np.maximum(index // half - 1, 0)
+    return ((index - shift * half) << shift) + (1 << shift) - 1
+
+def histogram_statistics(histogram, bits):
+    """P50 to P99.99 and maximum latency (us) of a histogram, within its precision."""
+    total = int(histogram.sum())
+    cumulative = np.cumsum(histogram)
+    statistics = {}
+    for percentile in HISTOGRAM_PERCENTILES:
+        index = np.searchsorted(cumulative, math.ceil(percentile / 100 * total))
+        statistics[f'{percentile:g}th Percentile (P{percentile:g}) Latency (us)'] = histogram_values(index, bits) / 1000 if total else 0.0
+    statistics['Maximum Latency (us)'] = histogram_values(np.flatnonzero(histogram)[-1], bits) / 1000 if total else 0.0
+    return statistics
+
+class SpscRing:
+    """Single-producer/single-consumer ring of fixed-size slots in a shared buffer.
+
+    head and tail are free-running sequence numbers: only the producer writes
+    head and only the consumer writes tail, so no lock is needed. Aligned
+    8-byte stores are atomic and x86 keeps stores in program order, which
+    makes a slot visible before the head that publishes it. A blocked end
+    spins for SPIN_LIMIT iterations and then starts yielding its CPU, so
+    pairs still make progress when they share a core.
+    """
+
+    def __init__(self, buf, offset, message_size, slots=RING_SLOTS):
+        self.message_size = message_size
+        self.slot_size = ring_slot_size(message_size)
+        self.slots = slots
+        self.head = buf[offset:offset + 8].cast('q')
+        self.tail = buf[offset + CACHE_LINE:offset + CACHE_LINE + 8].cast('q')
+        self.closed = buf[offset + 2 * CACHE_LINE:offset + 2 * CACHE_LINE + 8].cast('q')
+        data_offset = offset + RING_HEADER_BYTES
+        self.data = buf[data_offset:data_offset + slots * self.slot_size]
+
+    def push(self, payload):
+        head = self.head[0]
+        spins = 0
+        while head - self.tail[0] >= self.slots:
+            # Ring full, wait for the consumer
+            spins += 1
+            if spins > SPIN_LIMIT:
+                os.sched_yield()
+        start = (head % self.slots) * self.slot_size
+        self.data[start:start + self.message_size] = payload
+        self.head[0] = head + 1
+
+    def pop(self, out):
+        """Copy the next message into out; returns False once the ring is closed and drained."""
+        tail = self.tail[0]
+        spins = 0
+        while self.head[0] == tail:
+            if self.closed[0] and self.head[0] == tail:
+                return False
+            spins += 1
+            if spins > SPIN_LIMIT:
+                os.sched_yield()
+        start = (tail % self.slots) * self.slot_size
+        out[:] = self.data[start:start + self.message_size]
+        self.tail[0] = tail + 1
+        return True
+
+    def close(self):
+        self.closed[0] = 1
+
+    def release(self):
+        for view in (self.head, self.tail, self.closed, self.data):
+            view.release()
+
+def ring_slot_size(message_size):
+    return -(-message_size // CACHE_LINE) * CACHE_LINE
+
+def ring_size(message_size, slots=RING_SLOTS):
+    return RING_HEADER_BYTES + slots * ring_slot_size(message_size)
+
+class BroadcastRing:
+    """One-publisher/many-subscriber ring of sequenced slots in a shared buffer.
+
+    Every subscriber owns a read cursor. By default the publisher never waits:
+    when it laps a subscriber the slot sequence no longer matches that
+    subscriber's cursor and the skipped messages are counted as dropped. With
+    backpressure the publisher instead waits for the slowest cursor and the
+    time it spends waiting is reported as stalls.
+    """
+
+    def __init__(self, buf, offset, message_size, subscribers, slots=RING_SLOTS):
+        self.message_size = message_size
+        self.slot_size = ring_slot_size(BROADCAST_SLOT_HEADER + message_size)
+        self.slots = slots
+        self.subscribers = subscribers
+        self.head = buf[offset:offset + 8].cast('q')
+        self.closed = buf[offset + CACHE_LINE:offset + CACHE_LINE + 8].cast('q')
+        cursor_offset = offset + 2 * CACHE_LINE
+        # One cursor per cache line, read through a strided int64 view
+        self.cursors = buf[cursor_offset:cursor_offset + subscribers * CACHE_LINE].cast('q')
+        self.cursor_stride = CACHE_LINE // 8
+        data_offset = offset + broadcast_header_size(subscribers)
+        self.data = buf[data_offset:data_offset + slots * self.slot_size]
+        self.words = self.data.cast('q')
+        self.slot_words = self.slot_size // 8
+
+    def slowest_cursor(self):
+        return min(self.cursors[::self.cursor_stride])
+
+    def publish(self, payload, backpressure=False):
+        """Write the next message; returns the nanoseconds spent throttled by slow subscribers."""
+        head = self.head[0]
+        stalled_ns = 0
+        if backpressure and head - self.slowest_cursor() >= self.slots:
+            stall_start = time.perf_counter_ns()
+            spins = 0
+            while head - self.slowest_cursor() >= self.slots:
+                spins += 1
+                if spins > SPIN_LIMIT:
+                    os.sched_yield()
+            stalled_ns = max(1, time.perf_counter_ns() - stall_start)
+        word = (head % self.slots) * self.slot_words
+        # Invalidate the slot so readers of the previous lap notice the overwrite
+        self.words[word] = -1
+        self.words[word + 1] = time.perf_counter_ns()
+        start = word * 8 + BROADCAST_SLOT_HEADER
+        self.data[start:start + self.message_size] = payload
+        self.words[word] = head
+        self.head[0] = head + 1
+        return stalled_ns
+
+    def receive(self, subscriber, out):
+        """Copy the next message into out.
+
+        Returns (publish_ns, dropped), or None once the ring is closed and drained.
+        """
+        cursor_index = subscriber * self.cursor_stride
+        cursor = self.cursors[cursor_index]
+        spins = 0
+        while self.head[0] == cursor:
+            if self.closed[0] and self.head[0] == cursor:
+                return None
+            spins += 1
+            if spins > SPIN_LIMIT:
+                os.sched_yield()
+        dropped = 0
+        while True:
+            oldest = self.head[0] - self.slots
+            if cursor < oldest:
+                # Lapped by the publisher, resume at the oldest slot still intact
+                dropped += oldest - cursor
+                cursor = oldest
+            word = (cursor % self.slots) * self.slot_words
+            if self.words[word] == cursor:
+                publish_ns = self.words[word + 1]
+                start = word * 8 + BROADCAST_SLOT_HEADER
+                out[:] = self.data[start:start + self.message_size]
+                if self.words[word] == cursor:
+                    break
+            # Being overwritten, the lap check skips ahead once the publisher moves head
+        self.cursors[cursor_index] = cursor + 1
+        return publish_ns, dropped
+
+    def close(self):
+        self.closed[0] = 1
+
+    def release(self):
+        for view in (self.head, self.closed, self.cursors, self.words, self.data):
+            view.release()
+
+def broadcast_header_size(subscribers):
+    return (2 + subscribers) * CACHE_LINE
+
+def broadcast_ring_size(message_size, subscribers, slots=RING_SLOTS):
+    return broadcast_header_size(subscribers) + slots * ring_slot_size(BROADCAST_SLOT_HEADER + message_size)
+
+class SpinLock:
+    """Test-and-test-and-set spin lock on an int64 word in a shared buffer.
+
+    Python has no atomic read-modify-write, so taking the lock goes through
+    libatomic's __atomic_exchange_8 on the word's address. Waiters spin on a
+    plain read and start yielding their CPU after SPIN_LIMIT iterations.
+    """
+
+    def __init__(self, buf, offset):
+        self.word = buf[offset:offset + 8].cast('q')
+        self.address = ctypes.addressof(ctypes.c_int64.from_buffer(self.word))
+        self.exchange = atomic_exchange
+
+    def acquire(self):
+        spins = 0
+        while self.word[0] or self.exchange(self.address, 1, ATOMIC_SEQ_CST):
+            spins += 1
+            if spins > SPIN_LIMIT:
+                os.sched_yield()
+
+    def release(self):
+        self.exchange(self.address, 0, ATOMIC_SEQ_CST)
+
+    def close(self):
+        self.word.release()
+
+class SharedQueue:
+    """Many-producer/many-consumer queue in a shared buffer.
+
+    A two-lock queue: producers take the enqueue lock and consumers the
+    dequeue lock around an SPSC ring, so each ring end still has a single
+    writer at a time. The locks are SpinLocks in the queue header, or
+    posix_ipc semaphores or multiprocessing locks passed in by the parent.
+    Every producer calls close() when it is done and the last one closes
+    the ring.
+    """
+
+    def __init__(self, buf, offset, message_size, producers, locks=None, slots=RING_SLOTS):
+        self.producers = producers
+        self.finished = buf[offset:offset + 8].cast('q')
+        self.spin_locks = [] if locks else [SpinLock(buf, offset + CACHE_LINE), SpinLock(buf, offset + 2 * CACHE_LINE)]
+        self.enqueue_lock, self.dequeue_lock = locks or self.spin_locks
+        self.ring = SpscRing(buf, offset + QUEUE_HEADER_BYTES, message_size, slots)
+
+    def push(self, payload):
+        """Enqueue a message; returns the nanoseconds spent waiting for the enqueue lock."""
+        start = time.perf_counter_ns()
+        self.enqueue_lock.acquire()
+        waited_ns = time.perf_counter_ns() - start
+        try:
+            self.ring.push(payload)
+        finally:
+            self.enqueue_lock.release()
+        return waited_ns
+
+    def pop(self, out):
+        """Dequeue the next message into out.
+
+        Returns the nanoseconds spent waiting for the dequeue lock, or None
+        once every producer has closed and the queue is drained.
+        """
+        start = time.perf_counter_ns()
+        self.dequeue_lock.acquire()
+        waited_ns = time.perf_counter_ns() - start
+        try:
+            if not self.ring.pop(out):
+                return None
+        finally:
+            self.dequeue_lock.release()
+        return waited_ns
+
+    def close(self):
+        self.enqueue_lock.acquire()
+        try:
+            self.finished[0] += 1
+            if self.finished[0] == self.producers:
+                self.ring.close()
+        finally:
+            self.enqueue_lock.release()
+
+    def release(self):
+        self.finished.release()
+        for lock in self.spin_locks:
+            lock.close()
+        self.ring.release()
+
+def queue_size(message_size, slots=RING_SLOTS):
+    return QUEUE_HEADER_BYTES + ring_size(message_size, slots)
+
+def create_queue_locks(kind):
+    """Enqueue and dequeue locks for --lock, or None for spin locks that live in the queue itself."""
+    if kind == 'semaphore':
+        locks = [posix_ipc.Semaphore(None, posix_ipc.O_CREX, initial_value=1) for _ in range(2)]
+        # Workers inherit the open semaphores, so the names are not needed past this point
+        for lock in locks:
+            lock.unlink()
+        return locks
+    if kind == 'mp-lock':
+        return [multiprocessing.Lock(), multiprocessing.Lock()]
+    return None
+
+def close_queue_locks(locks):
+    for lock in locks or []:
+        if hasattr(lock, 'close'):
+            lock.close()
+
+class ShmChannel:
+    """Point-to-point channel over a pair of SPSC rings."""
+
+    def __init__(self, send_ring, recv_ring):
+        self.send_ring = send_ring
+        self.recv_ring = recv_ring
+
+    def send(self, payload):
+        self.send_ring.push(payload)
+
+    def recv_into(self, out):
+        return self.recv_ring.pop(out)
+
+    def close(self):
+        self.send_ring.close()
+
+    def release(self):
+        self.send_ring.release()
+        self.recv_ring.release()
+
+class PipeChannel:
+    def __init__(self, read_fd, write_fd):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+
+    def send(self, payload):
+        view = memoryview(payload)
+        while view:
+            view = view[os.write(self.write_fd, view):]
+
+    def recv_into(self, out):
+        view = memoryview(out)
+        while view:
+            received = os.readv(self.read_fd, [view])
+            if not received:
+                return False
+            view = view[received:]
+        return True
+
+    def close(self):
+        os.close(self.write_fd)
+        self.write_fd = None
+
+    def release(self):
+        os.close(self.read_fd)
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+
+class StreamSocketChannel:
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send(self, payload):
+        self.sock.sendall(payload)
+
+    def recv_into(self, out):
+        view = memoryview(out)
+        while view:
+            received = self.sock.recv_into(view)
+            if not received:
+                return False
+            view = view[received:]
+        return True
+
+    def close(self):
+        self.sock.shutdown(socket.SHUT_WR)
+
+    def release(self):
+        self.sock.close()
+
+class DatagramSocketChannel:
+    # An empty datagram marks the end of the stream
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send(self, payload):
+        self.sock.send(payload)
+
+    def recv_into(self, out):
+        return self.sock.recv_into(out) > 0
+
+    def close(self):
+        self.sock.send(b'')
+
+    def release(self):
+        self.sock.close()
+
+class MessageQueueChannel:
+    # An empty message marks the end of the stream
+
+    def __init__(self, send_queue, recv_queue, shared=False):
+        self.send_queue = send_queue
+        self.recv_queue = recv_queue
+        # Threads of one worker group share the queue objects of both ends
+        self.shared = shared
+
+    def send(self, payload):
+        self.send_queue.send(bytes(payload))
+
+    def recv_into(self, out):
+        message, _ = self.recv_queue.receive()
+        if not message:
+            return False
+        out[:] = message
+        return True
+
+    def close(self):
+        self.send_queue.send(b'')
+
+    def release(self):
+        if not self.shared:
+            self.send_queue.close()
+            self.recv_queue.close()
+
+class QueueChannel:
+    # An empty message marks the end of the stream
+
+    def __init__(self, send_queue, recv_queue, shared=False):
+        self.send_queue = send_queue
+        self.recv_queue = recv_queue
+        # Threads of one worker group share the queue objects of both ends
+        self.shared = shared
+
+    def send(self, payload):
+        self.send_queue.put(bytes(payload))
+
+    def recv_into(self, out):
+        message = self.recv_queue.get()
+        if not message:
+            return False
+        out[:] = message
+        return True
+
+    def close(self):
+        self.send_queue.put(b'')
+
+    def release(self):
+        # Flush the feeder thread before the worker exits; a shared queue is
+        # flushed when the group's process exits
+        if not self.shared:
+            self.send_queue.close()
+            self.send_queue.join_thread()
+
+class ConnectionChannel:
+    # An empty message marks the end of the stream
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def send(self, payload):
+        self.connection.send_bytes(payload)
+
+    def recv_into(self, out):
+        return self.connection.recv_bytes_into(out) > 0
+
+    def close(self):
+        self.connection.send_bytes(b'')
+
+    def release(self):
+        self.connection.close()
+
+class ChannelBroadcast:
+    """Publisher side of publish-subscribe over point-to-point channels.
+
+    Every message is sent to each subscriber in turn with its publish
+    timestamp in the first 8 bytes. Sends block instead of dropping, so drops
+    and stalls are always zero.
+    """
+
+    def __init__(self, channels):
+        self.channels = channels
+
+    def publish(self, payload, backpressure=False):
+        struct.pack_into('q', payload, 0, time.perf_counter_ns())
+        for channel in self.channels:
+            channel.send(payload)
+        return 0
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+    def release(self):
+        for channel in self.channels:
+            channel.release()
+
+class ChannelSubscription:
+    """Subscriber side of publish-subscribe over a point-to-point channel."""
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    def receive(self, subscriber, out):
+        if not self.channel.recv_into(out):
+            return None
+        return struct.unpack_from('q', out)[0], 0
+
+    def release(self):
+        self.channel.release()
+
+class Transport:
+    """Point-to-point links between workers, selected with --transport.
+
+    setup() runs in the parent before the workers start and creates both
+    ends of every link. Each worker then calls attach() with the (link, side)
+    ends it uses, which also closes its inherited copies of all other ends so
+    end-of-stream is seen. teardown() runs in the parent once the workers have
+    started and releases the parent's copies.
+
+    Request-response uses link i between client 2i (side 0) and server 2i+1
+    (side 1). Publish-subscribe uses link i between the publisher (side 0) and
+    subscriber i + 1 (side 1).
+    """
+
+    def __init__(self, message_size):
+        self.message_size = message_size
+        self.ends = []
+        # Set once a thread or asyncio worker process has closed the ends none of its workers use
+        self.detached = False
+
+    def setup(self, links, broadcast=False):
+        self.ends = [self.make_link() for _ in range(links)]
+
+    def attach(self, ends):
+        channels = [self.open_channel(self.ends[link][side]) for link, side in ends]
+        if not self.detached:
+            self.detach(ends)
+        return channels
+
+    def detach(self, ends):
+        """Close this process's copies of every end not in ends."""
+        for link, pair in enumerate(self.ends):
+            for side, end in enumerate(pair):
+                if (link, side) not in ends:
+                    self.close_end(end)
+        self.detached = True
+
+    async def open_stream(self, end):
+        """asyncio (reader, writer) over one end, for the asyncio worker model."""
+        raise ValueError(f"the asyncio worker model needs a stream transport: {', '.join(ASYNCIO_TRANSPORTS)}.")
+
+    def teardown(self):
+        for pair in self.ends:
+            for end in pair:
+                self.close_end(end)
+
+    def broadcast(self, subscribers):
+        return ChannelBroadcast(self.attach([(link, 0) for link in range(subscribers)]))
+
+    def subscribe(self, subscriber):
+        return ChannelSubscription(self.attach([(subscriber, 1)])[0])
+
+    def make_link(self):
+        raise NotImplementedError
+
+    def open_channel(self, end):
+        raise NotImplementedError
+
+    def close_end(self, end):
+        pass
+
+class ShmTransport(Transport):
+    """SPSC ring pairs, or one broadcast ring, in the benchmark's shared memory segment.
+
+    Rings get RING_SLOTS slots, or fewer when large messages would not fit
+    otherwise, down to the two slots a ping-pong needs.
+    """
+
+    def __init__(self, message_size, data):
+        super().__init__(message_size)
+        self.data = data
+        self.slots = RING_SLOTS
+
+    def setup(self, links, broadcast=False):
+        if broadcast:
+            fitting = (len(self.data) - broadcast_header_size(links)) // ring_slot_size(BROADCAST_SLOT_HEADER + self.message_size)
+            self.slots = min(RING_SLOTS, fitting)
+            size = broadcast_ring_size(self.message_size, links, self.slots)
+        else:
+            fitting = (len(self.data) // (2 * links) - RING_HEADER_BYTES) // ring_slot_size(self.message_size)
+            self.slots = min(RING_SLOTS, fitting)
+            size = links * 2 * ring_size(self.message_size, self.slots)
+        if self.slots < 2:
+            raise ValueError(f"shm transport rings do not fit in {len(self.data)} bytes of shared memory, increase --data_size.")
+        self.data[:size] = bytes(size)
+        self.links = links
+
+    def attach(self, ends):
+        channels = []
+        size = ring_size(self.message_size, self.slots)
+        for link, side in ends:
+            offset = link * 2 * size
+            rings = [SpscRing(self.data, offset, self.message_size, self.slots),
+                     SpscRing(self.data, offset + size, self.message_size, self.slots)]
+            channels.append(ShmChannel(rings[side], rings[1 - side]))
+        return channels
+
+    def teardown(self):
+        pass
+
+    def detach(self, ends):
+        self.detached = True
+
+    def setup_queue(self):
+        fitting = (len(self.data) - QUEUE_HEADER_BYTES - RING_HEADER_BYTES) // ring_slot_size(self.message_size)
+        self.slots = min(RING_SLOTS, fitting)
+        if self.slots < 1:
+            raise ValueError(f"shm transport queue does not fit in {len(self.data)} bytes of shared memory, increase --data_size.")
+        size = queue_size(self.message_size, self.slots)
+        self.data[:size] = bytes(size)
+
+    def queue(self, producers, locks=None):
+        return SharedQueue(self.data, 0, self.message_size, producers, locks, self.slots)
+
+    def broadcast(self, subscribers):
+        return BroadcastRing(self.data, 0, self.message_size, subscribers, self.slots)
+
+    def subscribe(self, subscriber):
+        return BroadcastRing(self.data, 0, self.message_size, self.links, self.slots)
+
+class PipeTransport(Transport):
+    # Each end is (read_fd, write_fd) over two anonymous pipes
+
+    def make_link(self):
+        forward_read, forward_write = os.pipe()
+        backward_read, backward_write = os.pipe()
+        return (backward_read, forward_write), (forward_read, backward_write)
+
+    def open_channel(self, end):
+        return PipeChannel(*end)
+
+    async def open_stream(self, end):
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(end[0], 'rb', buffering=0))
+        # StreamReaderProtocol rather than FlowControlMixin so writer.wait_closed() works
+        transport, protocol = await loop.connect_write_pipe(lambda: asyncio.StreamReaderProtocol(asyncio.StreamReader()),
+                                                            os.fdopen(end[1], 'wb', buffering=0))
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+    def close_end(self, end):
+        for fd in end:
+            os.close(fd)
+
+class SocketPairTransport(Transport):
+    sock_type = socket.SOCK_STREAM
+
+    def make_link(self):
+        return socket.socketpair(socket.AF_UNIX, self.sock_type)
+
+    def open_channel(self, end):
+        if self.sock_type == socket.SOCK_DGRAM:
+            return DatagramSocketChannel(end)
+        return StreamSocketChannel(end)
+
+    async def open_stream(self, end):
+        if self.sock_type == socket.SOCK_DGRAM:
+            return await super().open_stream(end)
+        return await asyncio.open_connection(sock=end)
+
+    def close_end(self, end):
+        end.close()
+
+class UnixDatagramTransport(SocketPairTransport):
+    sock_type = socket.SOCK_DGRAM
+
+class TcpTransport(SocketPairTransport):
+    """Connected TCP socket pairs over 127.0.0.1 with Nagle disabled."""
+
+    def make_link(self):
+        with socket.create_server(('127.0.0.1', 0)) as listener:
+            client = socket.create_connection(listener.getsockname())
+            server, _ = listener.accept()
+        for sock in (client, server):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return client, server
+
+class MessageQueueTransport(Transport):
+    """posix_ipc message queues, one per direction; names are unlinked at teardown."""
+
+    def setup(self, links, broadcast=False):
+        if posix_ipc is None:
+            raise ImportError("posix_ipc module is not available. Install it or use another --transport.")
+        self.names = []
+        super().setup(links, broadcast)
+
+    def make_link(self):
+        queues = []
+        for _ in range(2):
+            name = f"/ipc_benchmark_{os.getpid()}_{len(self.names)}"
+            self.names.append(name)
+            queues.append(posix_ipc.MessageQueue(name, flags=posix_ipc.O_CREX, max_message_size=self.message_size))
+        return (queues[0], queues[1]), (queues[1], queues[0])
+
+    def open_channel(self, end):
+        return MessageQueueChannel(*end, shared=self.detached)
+
+    def teardown(self):
+        for pair in self.ends:
+            pair[0][0].close()
+            pair[0][1].close()
+        for name in self.names:
+            posix_ipc.unlink_message_queue(name)
+
+class QueueTransport(Transport):
+    # multiprocessing.Queue objects, one per direction
+
+    def make_link(self):
+        forward, backward = multiprocessing.Queue(), multiprocessing.Queue()
+        return (forward, backward), (backward, forward)
+
+    def open_channel(self, end):
+        return QueueChannel(*end, shared=self.detached)
+
+class ConnectionTransport(Transport):
+    # Duplex multiprocessing.Pipe connections
+
+    def make_link(self):
+        return multiprocessing.Pipe()
+
+    def open_channel(self, end):
+        return ConnectionChannel(end)
+
+    def close_end(self, end):
+        end.close()
+
+TRANSPORTS = {
+    'shm': ShmTransport,
+    'pipe': PipeTransport,
+    'unix-stream': SocketPairTransport,
+    'unix-dgram': UnixDatagramTransport,
+    'tcp': TcpTransport,
+    'mqueue': MessageQueueTransport,
+    'mp-queue': QueueTransport,
+    'mp-pipe': ConnectionTransport,
+}
+
+def create_transport(name, message_size, data):
+    if name == 'shm':
+        return ShmTransport(message_size, data)
+    return TRANSPORTS[name](message_size)
+
+def transport_message_limit(name):
+    """Largest message (bytes) a datagram or message queue transport can carry on this host, or None if unbounded."""
+    if name == 'unix-dgram':
+        pair = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        limit = pair[0].getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF) - UNIX_DGRAM_OVERHEAD
+        for sock in pair:
+            sock.close()
+        return limit
+    if name == 'mqueue' and os.path.exists(MQUEUE_MSGSIZE_MAX):
+        with open(MQUEUE_MSGSIZE_MAX) as msgsize_max:
+            return int(msgsize_max.read())
+    return None
+
+def join_workers(processes):
+    """Wait for every worker process to exit.
+
+    A process that fails leaves its peers blocked on the barrier, a ring or a
+    socket forever, so the remaining processes are terminated and the run is
+    aborted instead.
+    """
+    pending = {process.sentinel: (index, process) for index, process in enumerate(processes)}
+    while pending:
+        for sentinel in multiprocessing.connection.wait(list(pending)):
+            index, process = pending.pop(sentinel)
+            process.join()
+            if process.exitcode:
+                for _, other in pending.values():
+                    other.terminate()
+                for _, other in pending.values():
+                    other.join()
+                raise RuntimeError(f"worker process {index} exited with code {process.exitcode}, aborting the run.")
+
+def parse_warmup(warmup):
+    """Split --warmup into (messages, seconds): "500" is 500 messages, "2s" is two seconds."""
+    if not warmup:
+        return 0, 0
+    warmup = str(warmup).strip()
+    try:
+        messages, seconds = (0, float(warmup[:-1])) if warmup.endswith('s') else (int(warmup), 0)
+    except ValueError:
+        raise ValueError(f"--warmup must be a message count like 500 or seconds like 2s, got {warmup!r}.") from None
+    if messages < 0 or seconds < 0:
+        raise ValueError(f"--warmup cannot be negative, got {warmup!r}.")
+    return messages, seconds
+
+def sent_after_warmup(stats, senders, sent_ns):
+    """Whether a message sent at sent_ns was sent after every sender left its warmup.
+
+    Subscribers end their warmup on this rather than on their own count, so a
+    lapped subscriber still splits the run where the publisher did. MPMC
+    producers use it to mark the messages consumers should count.
+    """
+    ends = stats[senders, STAT_WARMUP_END_NS]
+    return bool(ends.all()) and sent_ns >= ends.max()
+
+class SampleRecorder:
+    """Feeds one worker's messages into its sample ring and latency histograms.
+
+    record() stores a (start_ns, end_ns) pair. Every HISTOGRAM_FOLD_SAMPLES
+    pairs, and when the ring wraps, the new latencies are folded into the
+    current histogram, so the histogram sees every message while the worker
+    never pauses for long. Messages inside the --warmup window go to the warmup
+    histogram; the ring then restarts so per-second statistics only see the
+    steady state. Receivers pass steady to say whether a message was sent
+    after warmup instead of counting their own. record() and tick() return
+    True once the steady state has reached --duration or --message_count. Workers that record no latency
+    pass samples=None and only call tick(). The running count and warmup
+    state are published to the worker's stats row for live telemetry.
+    """
+
+    def __init__(self, samples, histogram, warmup_histogram, bits, args, live):
+        self.samples = samples
+        self.live = live
+        self.capacity = len(samples) if samples is not None else 1
+        self.bits = bits
+        self.steady_histogram = histogram
+        self.duration_ns = args.duration * 1000000000 if args.duration else 0
+        self.message_count = args.message_count
+        self.count = 0
+        self.first_ns = 0
+        # Ring slot of the first sample not yet folded into the histogram
+        self.folded = 0
+        self.warmup_count = 0
+        self.warmup_messages, warmup_seconds = parse_warmup(args.warmup)
+        self.warming_up = bool(self.warmup_messages or warmup_seconds)
+        now_ns = time.perf_counter_ns()
+        self.warmup_end_ns = now_ns + int(warmup_seconds * 1000000000)
+        self.live[STAT_LIVE_WARMUP] = self.warming_up
+        if self.warming_up:
+            self.histogram = warmup_histogram
+            self.deadline_ns = None
+        else:
+            self.histogram = histogram
+            self.deadline_ns = now_ns + self.duration_ns if self.duration_ns else None
+            self.live[STAT_WARMUP_END_NS] = now_ns
+
+    @property
+    def steady_count(self):
+        """Steady-state messages so far; none while the worker is still warming up."""
+        return 0 if self.warming_up else self.count
+
+    def record(self, start_ns, end_ns, steady=None):
+        if steady and self.warming_up:
+            self.finish_warmup(end_ns)
+        slot = self.count % self.capacity
+        if not slot and not self.count:
+            self.first_ns = end_ns
+        self.samples[slot] = (start_ns, end_ns)
+        if slot + 1 - self.folded == HISTOGRAM_FOLD_SAMPLES or slot == self.capacity - 1:
+            record_latencies(self.histogram, self.samples[self.folded:slot + 1], self.bits)
+            self.folded = (slot + 1) % self.capacity
+        return self.tick(end_ns, steady)
+
+    def tick(self, now_ns, steady=None):
+        self.count += 1
+        self.live[STAT_LIVE_COUNT] = self.count
+        if self.warming_up:
+            if steady is None and ((self.count >= self.warmup_messages) if self.warmup_messages
+                                   else (now_ns >= self.warmup_end_ns)):
+                self.finish_warmup(now_ns)
+            return False
+        if self.deadline_ns and now_ns >= self.deadline_ns:
+            return True  # Stop if duration is reached
+        return bool(self.message_count) and self.count >= self.message_count
+
+    def flush(self):
+        if self.samples is not None:
+            record_latencies(self.histogram, self.samples[self.folded:self.count % self.capacity], self.bits)
+            if self.count and not self.warming_up:
+                self.live[STAT_STEADY_FIRST_NS] = self.first_ns
+                self.live[STAT_STEADY_LAST_NS] = self.samples[(self.count - 1) % self.capacity, 1]
+        self.folded = 0
+
+    def finish_warmup(self, now_ns):
+        self.flush()
+        self.warmup_count = self.count
+        self.count = 0
+        self.warming_up = False
+        self.live[STAT_LIVE_COUNT] = 0
+        self.live[STAT_LIVE_WARMUP] = 0
+        self.live[STAT_WARMUP_END_NS] = now_ns
+        self.histogram = self.steady_histogram
+        self.deadline_ns = now_ns + self.duration_ns if self.duration_ns else None
+
+def payload_pool(message_size):
+    """Random bytes for a pool of pre-generated messages, created once per run."""
+    messages = max(1, min(PAYLOAD_POOL_SIZE, PAYLOAD_POOL_BYTES // max(1, message_size)))
+    return bytearray(os.urandom(messages * message_size))
+
+def payload_views(pool, message_size):
+    """Writable views of the individual messages in a payload pool."""
+    view = memoryview(pool)
+    return [view[start:start + message_size] for start in range(0, len(pool), message_size)]
+
+def mpmc_producers(args):
+    """Number of MPMC producers: --producers, or half of the processes."""
+    return args.producers or max(1, args.process_count // 2)
+
+def ipc_worker(transport, process_id, message_size, message_pattern, args, sample_name, capacities, barrier, cpus=None,
+               payloads=None, locks=None):
     #print("Creating ipc worker")
     
     num_messages = args.message_count
-    messages_processed = 0
     duration = args.duration
-    output = []
 
     if duration == 0 and num_messages == 0:
         raise ValueError("Both duration and num_messages cannot be 0. Specify a positive value for at least one of them.")
-    Rstart_time = time.time()
+
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+
+    sample_memory = multiprocessing.shared_memory.SharedMemory(name=sample_name)
+    bits = histogram_bits(args.histogram_precision)
+    counts, stats, histograms, samples = attach_sample_buffers(sample_memory, capacities, histogram_buckets(bits))
+    worker_stats = stats[process_id]
+    perf_counter_ns = time.perf_counter_ns
+    recorder = None
+    # Messages are sent straight out of the pool, so the loops allocate nothing
+    pool = payload_views(payloads, message_size)
+    verified = corrupt = 0
+
     if message_pattern == "request-response":
-        request = bytearray([random.randint(0, 255) for _ in range(message_size)])
+        # Even ids are clients, odd ids echo every request back as servers
+        channel = transport.attach([(process_id // 2, process_id % 2)])[0]
+        requests = itertools.cycle(zip(pool, [zlib.crc32(request) for request in pool]))
         response = bytearray(message_size)
+        barrier.wait()
 
-        while True:
-            start_time = time.perf_counter()
-            # Write request to shared memory
-            data[:message_size] = request
-
-            # Read response from shared memory
-            response[:] = data[:message_size]
-            end_time = time.perf_counter()
-
-            output.append({
-                'capture_time': datetime.utcfromtimestamp(end_time).strftime('%Y-%m-%dT%H:%M:%S.%f'),
-                'process_id': process_id,
-                'start_time': start_time,
-                'end_time': end_time
-            })
+        if process_id % 2:
+            while channel.recv_into(response):
+                channel.send(response)
+        else:
+            recorder = SampleRecorder(samples[process_id], histograms[STEADY_STATE, process_id],
+                                      histograms[WARMUP, process_id], bits, args, worker_stats)
+            while True:
+                request, checksum = next(requests)
+                start_time = perf_counter_ns()
+                # Send request to the server and wait for its response
+                channel.send(request)
+                channel.recv_into(response)
+                end_time = perf_counter_ns()
 
-            Rend_time = time.time()
-            if duration and (Rend_time - Rstart_time) >= duration:
-                break  # Stop if duration is reached
+                if args.verify:
+                    verified += 1
+                    if zlib.crc32(response) != checksum:
+                        corrupt += 1
 
-            messages_processed += 1
-            if num_messages and messages_processed >= num_messages:
-                break
+                if recorder.record(start_time, end_time):
+                    break
+
+            channel.close()
+        channel.release()
 
     elif message_pattern == "publish-subscribe":
-        while True:
-            message = bytearray([random.randint(0, 255) for _ in range(message_size)])
-            
-            # Write message to shared memory
-            start_time = time.perf_counter()
-            data[:message_size] = message
-            end_time = time.time()
-            print("capture data")
-            output.append({
-                'capture_time': datetime.utcfromtimestamp(end_time).strftime('%Y-%m-%dT%H:%M:%S.%f'),
-                'process_id': process_id,
-                'start_time': start_time,
-                'end_time': end_time
-            })
-            
-            Rend_time = time.perf_counter()
-            if duration and (Rend_time - Rstart_time) >= duration:
-                break  # Stop if duration is reached
-            
-            messages_processed += 1
-            if num_messages and messages_processed >= num_messages:
-                break
+        # Process 0 publishes, every other process subscribes with its own cursor
+        if process_id == 0:
+            ring = transport.broadcast(args.process_count - 1)
+            worker_stats[STAT_FIRST_STALL] = -1
+            barrier.wait()
+            # The publisher records no latency samples, it only paces the run
+            publisher = SampleRecorder(None, None, None, bits, args, worker_stats)
+            messages = itertools.cycle(pool)
+            while True:
+                stalled_ns = ring.publish(next(messages), args.backpressure)
+                if stalled_ns and not publisher.warming_up:
+                    if worker_stats[STAT_FIRST_STALL] < 0:
+                        worker_stats[STAT_FIRST_STALL] = publisher.count
+                    worker_stats[STAT_STALLS] += 1
+                    worker_stats[STAT_STALL_NS] += stalled_ns
 
-    timestamps.extend(output)
+                if publisher.tick(perf_counter_ns()):
+                    break
 
-def create_shared_memory(size, posix=False):
-    print("creating shared memory")
-    if posix:
-        print("using posix shared memory")
+            ring.close()
+            worker_stats[STAT_MESSAGES] = publisher.steady_count
+        else:
+            ring = transport.subscribe(process_id - 1)
+            message = bytearray(message_size)
+            # Channel transports overwrite the first 8 bytes with the publish timestamp
+            checksums = set(zlib.crc32(payload[8:]) for payload in pool)
+            payload = memoryview(message)[8:]
+            dropped = 0
+            barrier.wait()
+            recorder = SampleRecorder(samples[process_id], histograms[STEADY_STATE, process_id],
+                                      histograms[WARMUP, process_id], bits, args, worker_stats)
+            while True:
+                received = ring.receive(process_id - 1, message)
+                if received is None:
+                    break
+                end_time = perf_counter_ns()
+                publish_ns, missed = received
+
+                if args.verify:
+                    verified += 1
+                    if zlib.crc32(payload) not in checksums:
+                        corrupt += 1
+
+                recorder.record(publish_ns, end_time, recorder.warming_up and sent_after_warmup(stats, [0], publish_ns))
+                if not recorder.warming_up:
+                    dropped += missed
+
+            worker_stats[STAT_MESSAGES] = recorder.steady_count
+            worker_stats[STAT_DROPPED] = dropped
+            payload.release()
+        ring.release()
+
+    elif message_pattern == "mpmc":
+        # Ids below the producer count enqueue, the rest dequeue from the same queue
+        producers = mpmc_producers(args)
+        queue = transport.queue(producers, locks)
+        lock_wait_ns = 0
+        if process_id < producers:
+            barrier.wait()
+            producer = SampleRecorder(None, None, None, bits, args, worker_stats)
+            messages = itertools.cycle(pool)
+            # The steady state starts once every producer has left warmup; until then the
+            # enqueue time is sent negated so consumers split the run at the same message
+            produced = 0
+            all_steady = not producer.warming_up
+            while True:
+                message = next(messages)
+                # The enqueue time travels in the first 8 bytes, so lock waits count towards latency
+                enqueue_ns = perf_counter_ns()
+                if not all_steady and not producer.warming_up:
+                    all_steady = sent_after_warmup(stats, slice(0, producers), enqueue_ns)
+                struct.pack_into('q', message, 0, enqueue_ns if all_steady else -enqueue_ns)
+                lock_wait_ns += queue.push(message)
+                produced += all_steady
+
+                if producer.tick(perf_counter_ns()):
+                    break
+
+            queue.close()
+            worker_stats[STAT_MESSAGES] = produced
+        else:
+            message = bytearray(message_size)
+            checksums = set(zlib.crc32(payload[8:]) for payload in pool)
+            payload = memoryview(message)[8:]
+            barrier.wait()
+            recorder = SampleRecorder(samples[process_id], histograms[STEADY_STATE, process_id],
+                                      histograms[WARMUP, process_id], bits, args, worker_stats)
+            while True:
+                waited_ns = queue.pop(message)
+                if waited_ns is None:
+                    break
+                end_time = perf_counter_ns()
+                lock_wait_ns += waited_ns
+
+                if args.verify:
+                    verified += 1
+                    if zlib.crc32(payload) not in checksums:
+                        corrupt += 1
+
+                enqueue_ns = struct.unpack_from('q', message)[0]
+                # Warmup messages dequeued after the first steady one are left out of both phases
+                if enqueue_ns > 0 or recorder.warming_up:
+                    recorder.record(abs(enqueue_ns), end_time, enqueue_ns > 0)
+
+            worker_stats[STAT_MESSAGES] = recorder.steady_count
+            payload.release()
+        worker_stats[STAT_LOCK_WAIT_NS] = lock_wait_ns
+        queue.release()
+
+    worker_stats[STAT_VERIFIED] = verified
+    worker_stats[STAT_CORRUPT] = corrupt
+
+    if recorder:
+        recorder.flush()
+        counts[process_id] = recorder.steady_count
+    del counts, stats, histograms, samples, worker_stats, recorder, pool
+    sample_memory.close()
+
+def workers_per_process(args):
+    """Workers sharing one process: threads per process, tasks per event loop, or 1 for the process model."""
+    if args.worker_model == 'thread':
+        return args.threads_per_process or args.process_count
+    if args.worker_model == 'asyncio':
+        return args.tasks_per_loop or args.process_count
+    return 1
+
+def worker_ends(args, process_id):
+    """The (link, side) transport ends a worker uses, as in ipc_worker."""
+    if args.message_pattern == "request-response":
+        return [(process_id // 2, process_id % 2)]
+    if args.message_pattern == "publish-subscribe":
+        return [(link, 0) for link in range(args.process_count - 1)] if process_id == 0 else [(process_id - 1, 1)]
+    return []
+
+class SchedulingProbe:
+    """Measures how late a thread or asyncio worker process runs code that is ready to run.
+
+    Every PROBE_INTERVAL the probe sleeps and records how much later than
+    asked it woke up. In a thread worker process that delay is mostly
+    waiting for the GIL; on an event loop it is the time ready callbacks
+    wait behind other tasks. The oversleep of the idle process, measured
+    before the workers start, is subtracted so timer slack is not counted.
+    """
+
+    def __init__(self, histogram, bits):
+        self.histogram = histogram
+        self.bits = bits
+        self.interval_ns = int(PROBE_INTERVAL * 1000000000)
+        self.pairs = np.zeros((PROBE_BATCH, SAMPLE_FIELDS), dtype=np.int64)
+        self.count = 0
+        self.slack_ns = 0
+
+    def add(self, expected_ns, now_ns):
+        self.pairs[self.count] = (expected_ns + self.slack_ns, now_ns)
+        self.count += 1
+        if self.count == PROBE_BATCH:
+            self.flush()
+
+    def flush(self):
+        record_latencies(self.histogram, self.pairs[:self.count], self.bits)
+        self.count = 0
+
+    def calibrate(self):
+        lags = []
+        for _ in range(PROBE_CALIBRATION):
+            expected_ns = time.perf_counter_ns() + self.interval_ns
+            time.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter_ns() - expected_ns)
+        self.slack_ns = int(np.median(lags))
+
+    async def calibrate_async(self):
+        lags = []
+        for _ in range(PROBE_CALIBRATION):
+            expected_ns = time.perf_counter_ns() + self.interval_ns
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter_ns() - expected_ns)
+        self.slack_ns = int(np.median(lags))
+
+    def run(self, stop_event):
+        while not stop_event.is_set():
+            expected_ns = time.perf_counter_ns() + self.interval_ns
+            time.sleep(PROBE_INTERVAL)
+            self.add(expected_ns, time.perf_counter_ns())
+        self.flush()
+
+    async def run_async(self):
         try:
-            shm_name = "/shm_" + str(random.randint(1, 1000000))
-            shm = posix_ipc.SharedMemory(shm_name, flags=posix_ipc.O_CREAT, size=size * 1024 * 1024)
-            shared_memory = multiprocessing.shared_memory.SharedMemory(shm_name)
-            shm.close_fd()
-        except posix_ipc.ExistentialError:
-            # Handle the case where shared memory with the same name already exists
-            shm = posix_ipc.SharedMemory(None, flags=posix_ipc.O_RDWR)
-            shared_memory = multiprocessing.shared_memory.SharedMemory(shm_name)
+            while True:
+                expected_ns = time.perf_counter_ns() + self.interval_ns
+                await asyncio.sleep(PROBE_INTERVAL)
+                self.add(expected_ns, time.perf_counter_ns())
+        finally:
+            self.flush()
+
+async def async_ipc_worker(transport, process_id, args, counts, stats, histograms, samples, bits, barrier, executor, pool):
+    """ipc_worker for the asyncio worker model: the same patterns over asyncio streams on the process's event loop."""
+    message_size = args.message_size
+    worker_stats = stats[process_id]
+    perf_counter_ns = time.perf_counter_ns
+    loop = asyncio.get_running_loop()
+    recorder = None
+    verified = corrupt = 0
+    # Publish-subscribe messages carry the publish timestamp in their first 8 bytes
+    checksums = set(zlib.crc32(payload[8:]) for payload in pool)
+
+    if args.message_pattern == "request-response":
+        reader, writer = await transport.open_stream(transport.ends[process_id // 2][process_id % 2])
+        await loop.run_in_executor(executor, barrier.wait)
+
+        if process_id % 2:
+            while True:
+                try:
+                    request = await reader.readexactly(message_size)
+                except asyncio.IncompleteReadError:
+                    break
+                writer.write(request)
+                await writer.drain()
+        else:
+            recorder = SampleRecorder(samples[process_id], histograms[STEADY_STATE, process_id],
+                                      histograms[WARMUP, process_id], bits, args, worker_stats)
+            requests = itertools.cycle(zip(pool, [zlib.crc32(request) for request in pool]))
+            while True:
+                request, checksum = next(requests)
+                start_time = perf_counter_ns()
+                writer.write(request)
+                await writer.drain()
+                response = await reader.readexactly(message_size)
+                end_time = perf_counter_ns()
+
+                if args.verify:
+                    verified += 1
+                    if zlib.crc32(response) != checksum:
+                        corrupt += 1
+
+                if recorder.record(start_time, end_time):
+                    break
+        writer.close()
+        await writer.wait_closed()
+
+    elif args.message_pattern == "publish-subscribe":
+        if process_id == 0:
+            streams = [await transport.open_stream(transport.ends[link][0]) for link in range(args.process_count - 1)]
+            await loop.run_in_executor(executor, barrier.wait)
+            publisher = SampleRecorder(None, None, None, bits, args, worker_stats)
+            messages = itertools.cycle(pool)
+            while True:
+                message = next(messages)
+                struct.pack_into('q', message, 0, perf_counter_ns())
+                for _, writer in streams:
+                    writer.write(message)
+                for _, writer in streams:
+                    await writer.drain()
+
+                if publisher.tick(perf_counter_ns()):
+                    break
+
+            for _, writer in streams:
+                writer.close()
+                await writer.wait_closed()
+            worker_stats[STAT_MESSAGES] = publisher.steady_count
+        else:
+            reader, writer = await transport.open_stream(transport.ends[process_id - 1][1])
+            await loop.run_in_executor(executor, barrier.wait)
+            recorder = SampleRecorder(samples[process_id], histograms[STEADY_STATE, process_id],
+                                      histograms[WARMUP, process_id], bits, args, worker_stats)
+            while True:
+                try:
+                    message = await reader.readexactly(message_size)
+                except asyncio.IncompleteReadError:
+                    break
+                end_time = perf_counter_ns()
+
+                if args.verify:
+                    verified += 1
+                    if zlib.crc32(message[8:]) not in checksums:
+                        corrupt += 1
+
+                publish_ns = struct.unpack_from('q', message)[0]
+                recorder.record(publish_ns, end_time, recorder.warming_up and sent_after_warmup(stats, [0], publish_ns))
+
+            worker_stats[STAT_MESSAGES] = recorder.steady_count
+            writer.close()
+            await writer.wait_closed()
+
+    worker_stats[STAT_VERIFIED] = verified
+    worker_stats[STAT_CORRUPT] = corrupt
+    if recorder:
+        recorder.flush()
+        counts[process_id] = recorder.steady_count
+
+async def run_worker_tasks(transport, worker_ids, args, counts, stats, histograms, samples, bits, barrier, payloads, probe):
+    await probe.calibrate_async()
+    probe_task = asyncio.create_task(probe.run_async())
+    pool = payload_views(payloads, args.message_size)
+    # Every task waits on the barrier from its own thread so the loop keeps running
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(worker_ids)) as executor:
+        try:
+            await asyncio.gather(*[async_ipc_worker(transport, process_id, args, counts, stats, histograms, samples, bits,
+                                                    barrier, executor, pool) for process_id in worker_ids])
+        except BaseException:
+            # Tasks still waiting on the barrier would keep the executor, and so the process, alive
+            barrier.abort()
+            raise
+    probe_task.cancel()
+    try:
+        await probe_task
+    except asyncio.CancelledError:
+        pass
+    del pool
+
+def abort_worker_group(exception):
+    """threading.excepthook for worker groups: a failed worker thread takes its process down so the parent aborts the run."""
+    threading.__excepthook__(exception)
+    sys.stderr.flush()
+    os._exit(1)
+
+def worker_group(transport, worker_ids, args, sample_name, capacities, barrier, cpus=None, payloads=None, locks=None):
+    """Run several workers in one process: as threads (--worker_model thread) or as tasks on one event loop (asyncio).
+
+    A SchedulingProbe runs alongside them and records into the SCHEDULING
+    histogram row of the first worker.
+    """
+    transport.detach([end for process_id in worker_ids for end in worker_ends(args, process_id)])
+    sample_memory = multiprocessing.shared_memory.SharedMemory(name=sample_name)
+    bits = histogram_bits(args.histogram_precision)
+    counts, stats, histograms, samples = attach_sample_buffers(sample_memory, capacities, histogram_buckets(bits))
+    probe = SchedulingProbe(histograms[SCHEDULING, worker_ids[0]], bits)
+
+    if args.worker_model == 'thread':
+        threading.excepthook = abort_worker_group
+        probe.calibrate()
+        stop_event = threading.Event()
+        probe_thread = threading.Thread(target=probe.run, args=(stop_event,))
+        # Each thread gets its own copy of the pool: producers and publishers write timestamps into their messages
+        threads = [threading.Thread(target=ipc_worker, args=(transport, process_id, args.message_size, args.message_pattern, args,
+                                                             sample_name, capacities, barrier, cpus[i] if cpus else None,
+                                                             bytearray(payloads), locks))
+                   for i, process_id in enumerate(worker_ids)]
+        probe_thread.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop_event.set()
+        probe_thread.join()
     else:
+        if cpus:
+            os.sched_setaffinity(0, set().union(*cpus))
+        asyncio.run(run_worker_tasks(transport, worker_ids, args, counts, stats, histograms, samples, bits, barrier,
+                                     payloads, probe))
+
+    del counts, stats, histograms, samples, probe
+    sample_memory.close()
+
+def parse_cpu_list(cpu_list):
+    """Expand a Linux style CPU list such as "0-3,8" into a sorted list of CPU ids."""
+    cpus = set()
+    for part in str(cpu_list).split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.update(range(int(first), int(last) + 1))
+        elif part.strip():
+            cpus.add(int(part))
+    return sorted(cpus)
+
+def numa_node_cpus(node):
+    try:
+        with open(f'/sys/devices/system/node/node{node}/cpulist') as cpulist:
+            return set(parse_cpu_list(cpulist.read().strip()))
+    except FileNotFoundError:
+        raise ValueError(f"NUMA node {node} does not exist on this host.")
+
+def cpu_topology(cpus):
+    """(package, core, cpu) for each CPU, read from sysfs; without sysfs every CPU is its own core."""
+    topology = []
+    for cpu in sorted(cpus):
+        base = f'/sys/devices/system/cpu/cpu{cpu}/topology/'
+        try:
+            with open(base + 'physical_package_id') as package_file, open(base + 'core_id') as core_file:
+                topology.append((int(package_file.read()), int(core_file.read()), cpu))
+        except FileNotFoundError:
+            topology.append((0, cpu, cpu))
+    return topology
+
+def effective_cpu_list(args):
+    """--cpu_list, or else the CPUs a parallel sweep assigned to this permutation."""
+    return args.cpu_list or getattr(args, 'sweep_cpus', None)
+
+def worker_cpus(args):
+    """CPU set for each worker, or None to leave placement to the scheduler.
+
+    Communicating workers are adjacent ids (request-response pairs, the
+    publisher and its first subscriber), so each strategy orders the CPUs
+    such that neighbours share a core ('smt'), share a socket but not a core
+    ('socket') or sit on different sockets ('cross-socket'). Workers are
+    assigned round-robin over that order. Strategy 'none' only confines all
+    workers to --cpu_list and --numa_node. CPUs outside the current affinity
+    (offline, or not allowed to this process) are dropped.
+    """
+    cpu_list = effective_cpu_list(args)
+    if args.pin_strategy == 'none' and not cpu_list and args.numa_node is None:
+        return None
+    cpus = os.sched_getaffinity(0)
+    if cpu_list:
+        cpus &= set(parse_cpu_list(cpu_list))
+    if args.numa_node is not None:
+        cpus &= numa_node_cpus(args.numa_node)
+    if not cpus:
+        raise ValueError("No CPUs left for the workers after applying --cpu_list and --numa_node.")
+    if args.pin_strategy == 'none':
+        return [cpus] * args.process_count
+
+    cores = {}
+    for package, core, cpu in cpu_topology(cpus):
+        cores.setdefault((package, core), []).append(cpu)
+    # Rank of each CPU among its core's SMT threads
+    ranked = [(package, rank, core, cpu) for (package, core), threads in cores.items()
+              for rank, cpu in enumerate(threads)]
+
+    if args.pin_strategy == 'smt':
+        order = [cpu for key in sorted(cores) if len(cores[key]) > 1 for cpu in cores[key]]
+        if not order:
+            raise ValueError("--pin_strategy smt needs CPUs with SMT siblings in --cpu_list.")
+    elif args.pin_strategy == 'socket':
+        order = [cpu for _, _, _, cpu in sorted(ranked)]
+    elif args.pin_strategy == 'cross-socket':
+        packages = {}
+        for package, rank, core, cpu in sorted(ranked):
+            packages.setdefault(package, []).append(cpu)
+        if len(packages) < 2:
+            raise ValueError("--pin_strategy cross-socket needs CPUs from at least two sockets.")
+        order = [cpu for group in itertools.zip_longest(*packages.values()) for cpu in group if cpu is not None]
+    return [{order[i % len(order)]} for i in range(args.process_count)]
+
+def prefault_buffers(buffers, cpus=None, lock=False):
+    """Fault in every page of the buffers before any timing starts.
+
+    With cpus the parent runs on those CPUs while touching, so the pages are
+    allocated on their NUMA node. With lock the pages are also mlock'd;
+    a failure (usually RLIMIT_MEMLOCK) is reported and the run goes on.
+    """
+    previous = os.sched_getaffinity(0)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    try:
+        for buffer in buffers:
+            np.frombuffer(buffer, dtype=np.uint8)[::mmap.PAGESIZE] = 0
+            if lock:
+                libc = ctypes.CDLL(None, use_errno=True)
+                address = ctypes.c_char.from_buffer(buffer)
+                if libc.mlock(ctypes.c_void_p(ctypes.addressof(address)), ctypes.c_size_t(len(buffer))):
+                    print(f"mlock failed: {os.strerror(ctypes.get_errno())}")
+                del address
+    finally:
+        os.sched_setaffinity(0, previous)
+
+def huge_page_size():
+    """Default huge page size and number of free huge pages, from /proc/meminfo."""
+    meminfo = {}
+    with open('/proc/meminfo') as meminfo_file:
+        for line in meminfo_file:
+            key, value = line.split(':', 1)
+            meminfo[key] = int(value.split()[0])
+    return meminfo.get('Hugepagesize', 0) * 1024, meminfo.get('HugePages_Free', 0)
+
+class SegmentMapping:
+    """A MAP_SHARED mapping of a file descriptor, with the buf/close() interface of SharedMemory."""
+
+    def __init__(self, fd, size):
+        self._mmap = mmap.mmap(fd, size)
+        self.buf = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+class MappedSegment(SegmentMapping):
+    """Shared segment backed by a memfd or by a file on hugetlbfs, tmpfs or disk.
+
+    It stands in for a SharedMemory segment: attach() maps it a second time
+    the way SharedMemory(name=...) does. A backing file is unlinked as soon
+    as it is created, since every mapping goes through the descriptor, so no
+    file is left behind however the run ends. Huge page backed segments are
+    rounded up to whole huge pages, and are refused up front when not enough
+    huge pages are free, because touching an unbacked huge page raises
+    SIGBUS instead of an error.
+    """
+
+    def __init__(self, size, backing, directory=None, hugepages=False):
+        if hugepages:
+            page_size, free_pages = huge_page_size()
+            size = -(-size // page_size) * page_size
+            if size // page_size > free_pages:
+                raise ValueError(f"{size // page_size} free huge pages are needed but {free_pages} are available; "
+                                 f"reserve more with /proc/sys/vm/nr_hugepages.")
+        if backing == 'memfd':
+            self.fd = os.memfd_create('ipc_benchmark', os.MFD_HUGETLB if hugepages else 0)
+            self.name = f"memfd:{self.fd}"
+        else:
+            self.fd, self.name = tempfile.mkstemp(prefix='ipc_benchmark_', dir=directory)
+            os.unlink(self.name)
+        self.size = size
+        try:
+            os.ftruncate(self.fd, size)
+            super().__init__(self.fd, size)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def attach(self):
+        return SegmentMapping(self.fd, self.size)
+
+    def close(self):
+        super().close()
+        os.close(self.fd)
+
+    def unlink(self):
+        # The file was unlinked at creation; its pages are freed once the last mapping closes
+        pass
+
+def segment_backing(args):
+    # --posix predates --backing and still selects posix_ipc segments
+    return 'posix' if args.posix else args.backing
+
+def mount_fs_type(path):
+    """Filesystem type of the mount that holds path, from /proc/mounts."""
+    path = os.path.realpath(path)
+    longest, fs_type = '', None
+    with open('/proc/mounts') as mounts_file:
+        for line in mounts_file:
+            _, mount_point, mount_type = line.split()[:3]
+            mount_point = mount_point.replace('\\040', ' ')
+            # The deepest mount point containing path wins; of stacked mounts the last one listed
+            if ((path == mount_point or path.startswith(mount_point.rstrip('/') + '/'))
+                    and len(mount_point) >= len(longest)):
+                longest, fs_type = mount_point, mount_type
+    return fs_type
+
+def create_shared_memory(size, backing='shm', directory=None, hugepages=False):
+    print("creating shared memory")
+    if backing == 'posix':
+        print("using posix shared memory")
+        # With no name posix_ipc picks an unused one, so creation cannot collide with an existing segment
+        shm = posix_ipc.SharedMemory(None, flags=posix_ipc.O_CREX, size=size * 1024 * 1024)
+        shared_memory = multiprocessing.shared_memory.SharedMemory(shm.name)
+        shm.close_fd()
+    elif backing == 'shm':
         print("using system V shared memory")
         shared_memory = multiprocessing.shared_memory.SharedMemory(create=True, size=size * 1024 * 1024)
+    else:
+        print(f"using {backing} shared memory{' on huge pages' if hugepages or backing == 'hugetlbfs' else ''}")
+        if backing == 'hugetlbfs':
+            directory = directory or HUGETLBFS_MOUNT
+            # Any other directory would silently back the segment with regular pages
+            if not os.path.isdir(directory) or mount_fs_type(directory) != 'hugetlbfs':
+                raise ValueError(f"hugetlbfs is not mounted at {directory}; mount it or pass --backing_dir.")
+        shared_memory = MappedSegment(size * 1024 * 1024, backing, directory, hugepages or backing == 'hugetlbfs')
     return shared_memory
 
-def run_ipc_benchmark(args):
+def attach_shared_memory(shared_memory):
+    """A second mapping of a segment from create_shared_memory, closed independently of it."""
+    if isinstance(shared_memory, MappedSegment):
+        return shared_memory.attach()
+    return multiprocessing.shared_memory.SharedMemory(name=shared_memory.name)
+
+def resource_usage_delta(before, after):
+    """Page faults and context switches between two getrusage(RUSAGE_CHILDREN) snapshots."""
+    return {
+        'Minor Page Faults': after.ru_minflt - before.ru_minflt,
+        'Major Page Faults': after.ru_majflt - before.ru_majflt,
+        'Voluntary Context Switches': after.ru_nvcsw - before.ru_nvcsw,
+        'Involuntary Context Switches': after.ru_nivcsw - before.ru_nivcsw
+    }
+
+def publish_subscribe_statistics(stats, histograms, bits, duration_runtime):
+    """Publisher throttling and per-subscriber delivery statistics for one run."""
+    publisher = stats[0]
+    subscribers = []
+    for process_id in range(1, len(stats)):
+        subscribers.append({
+            'Subscriber': process_id,
+            'Received Messages': int(stats[process_id, STAT_MESSAGES]),
+            'Dropped Messages': int(stats[process_id, STAT_DROPPED]),
+            **histogram_statistics(histograms[process_id], bits)
+        })
+    return {
+        'Publisher': {
+            'Published Messages': int(publisher[STAT_MESSAGES]),
+            'Publish Msg/s': publisher[STAT_MESSAGES] / duration_runtime,
+            'Stalls': int(publisher[STAT_STALLS]),
+            'Stall Time (us)': publisher[STAT_STALL_NS] / 1000,
+            # -1 when slow subscribers never throttled the publisher
+            'First Stall At Message': int(publisher[STAT_FIRST_STALL])
+        },
+        'Subscribers': subscribers
+    }
+
+def contention_statistics(stats, producers):
+    """Queue throughput and lock waits of one MPMC run.
+
+    Rates are taken over the consumers' steady state, from the first to the
+    last dequeue, so process startup does not dilute them. Msg/s per process
+    divides the consumed rate by every producer and consumer, so sweeping
+    --process_count shows how far throughput is from scaling linearly.
+    """
+    produced = int(stats[:producers, STAT_MESSAGES].sum())
+    consumed = int(stats[producers:, STAT_MESSAGES].sum())
+    span = steady_state_span(stats, slice(producers, None))
+    consume_rate = consumed / span if span else 0.0
+    return {
+        'Producers': producers,
+        'Consumers': len(stats) - producers,
+        'Produced Messages': produced,
+        'Consumed Messages': consumed,
+        'Consume Msg/s': consume_rate,
+        'Msg/s per Process': consume_rate / len(stats),
+        'Average Enqueue Lock Wait (us)': stats[:producers, STAT_LOCK_WAIT_NS].sum() / max(produced, 1) / 1000,
+        'Average Dequeue Lock Wait (us)': stats[producers:, STAT_LOCK_WAIT_NS].sum() / max(consumed, 1) / 1000
+    }
+
+def worker_model_statistics(histogram, bits, latency, process_latency, args):
+    """Scheduling lag of thread or asyncio worker processes, set against the process model.
+
+    latency and process_latency are the P50 latencies (us) of this worker
+    model and of a process model run of the same pattern and transport;
+    their difference is what sharing a process costs. The scheduling lag
+    of the probe is reported as measured: its calibrated idle oversleep is
+    already subtracted, so lags that clip to zero mean the probe ran as soon
+    as it woke and only the upper percentiles show contention.
+    """
+    populated = np.flatnonzero(histogram)
+    average_lag = (np.average(histogram_values(populated, bits), weights=histogram[populated]) / 1000
+                   if len(populated) else 0.0)
+    lag = histogram_statistics(histogram, bits)
+    return {
+        'Workers per Process': workers_per_process(args),
+        'P50 Latency (us)': latency,
+        'Process Model P50 Latency (us)': process_latency,
+        'Worker Model Overhead (us)': latency - process_latency,
+        'Average Scheduling Lag (us)': average_lag,
+        'P50 Scheduling Lag (us)': lag['50th Percentile (P50) Latency (us)'],
+        'P99 Scheduling Lag (us)': lag['99th Percentile (P99) Latency (us)'],
+        'Maximum Scheduling Lag (us)': lag['Maximum Latency (us)']
+    }
+
+def steady_state_span(stats, workers=slice(None)):
+    """Seconds from the first to the last steady-state message the given workers received.
+
+    Startup, warmup and shutdown fall outside the span, so rates over it are
+    not diluted on short runs. Workers that recorded nothing are skipped.
+    """
+    rows = stats[workers]
+    rows = rows[rows[:, STAT_STEADY_LAST_NS] > 0]
+    if not len(rows):
+        return 0.0
+    return (rows[:, STAT_STEADY_LAST_NS].max() - rows[:, STAT_STEADY_FIRST_NS].min()) / 1000000000
+
+def per_second_statistics(worker_pairs, message_size, clock_offset_ns):
+    """Bucket the (start_ns, end_ns) pairs of every worker by wall-clock second and process.
+
+    Returns flat arrays ordered by second, then process id: the epoch second,
+    the process id, the average latency (us), the message count and the
+    throughput (MB/s) of each bucket that saw at least one message. Each
+    worker is reduced with np.bincount, so the cost is linear in the number
+    of samples and no per-sample Python code runs.
+    """
+    num_processes = len(worker_pairs)
+    worker_seconds = [(pairs[:, 1] + clock_offset_ns) // 1000000000 for pairs in worker_pairs]
+    populated = [seconds for seconds in worker_seconds if len(seconds)]
+    if not populated:
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty, empty
+    first_second = min(int(seconds.min()) for seconds in populated)
+    span = max(int(seconds.max()) for seconds in populated) - first_second + 1
+
+    # [process, second] grids of message counts and latency sums
+    message_counts = np.zeros((num_processes, span), dtype=np.int64)
+    latency_sums = np.zeros((num_processes, span))
+    for process_id, (pairs, seconds) in enumerate(zip(worker_pairs, worker_seconds)):
+        if not len(seconds):
+            continue
+        buckets = seconds - first_second
+        message_counts[process_id] = np.bincount(buckets, minlength=span)
+        latency_sums[process_id] = np.bincount(buckets, weights=pairs[:, 1] - pairs[:, 0], minlength=span)
+
+    # Transpose so buckets come out second-major, matching the log and print_table order
+    second_offsets, process_ids = np.nonzero(message_counts.T)
+    mps = message_counts[process_ids, second_offsets]
+    latency = latency_sums[process_ids, second_offsets] / mps / 1000
+    throughput = mps * message_size / 1024 / 1024
+    return second_offsets + first_second, process_ids, latency, mps, throughput
+
+def store_default(value):
+    # NumPy scalars in summaries are stored as plain JSON numbers
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+def pad8(length):
+    return -length % 8
+
+def append_record(path, kind, key, payload):
+    """Append one record to a results store, creating the store if needed.
+
+    Every record is written with a single write under an exclusive lock, so
+    workers of a parallel sweep can share one store and a crash never leaves
+    more than the record in flight incomplete.
+    """
+    payload = bytes(payload) + bytes(pad8(len(payload)))
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        record = RECORD_HEADER.pack(kind, key.encode(), len(payload)) + payload
+        if os.fstat(fd).st_size == 0:
+            record = STORE_MAGIC + record
+        view = memoryview(record)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+def append_json_record(path, kind, key, value):
+    append_record(path, kind, key, json.dumps(value, default=store_default).encode())
+
+def append_columns_record(path, key, columns, **attributes):
+    """Append a table as one contiguous block per column, described by a small JSON header."""
+    columns = {name: np.ascontiguousarray(column) for name, column in columns.items()}
+    meta = json.dumps({
+        'attributes': attributes,
+        'columns': [[name, column.dtype.str, len(column)] for name, column in columns.items()]
+    }).encode()
+    parts = [struct.pack('<Q', len(meta)), meta, bytes(pad8(len(meta)))]
+    for column in columns.values():
+        parts.extend([column.tobytes(), bytes(pad8(column.nbytes))])
+    append_record(path, RECORD_COLUMNS, key, b''.join(parts))
+
+class ResultsStore:
+    """Lazy reader for an append-only results store.
+
+    Only the record headers are read up front. JSON records are parsed when
+    asked for and column blocks are memory mapped, so stores larger than
+    memory can be reported on.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = []
+        with open(path, 'rb') as store_file:
+            if store_file.read(len(STORE_MAGIC)) != STORE_MAGIC:
+                raise ValueError(f"{path} is not an IPC benchmark results store.")
+            size = os.fstat(store_file.fileno()).st_size
+            offset = len(STORE_MAGIC)
+            while offset + RECORD_HEADER.size <= size:
+                kind, key, length = RECORD_HEADER.unpack(store_file.read(RECORD_HEADER.size))
+                offset += RECORD_HEADER.size
+                if offset + length > size:
+                    # A record cut short by an interrupted run
+                    break
+                self.records.append((kind, key.decode(), offset, length))
+                offset += length
+                store_file.seek(offset)
+
+    def find(self, kind, key=None):
+        return [record for record in self.records if record[0] == kind and (key is None or record[1] == key)]
+
+    def read_json(self, record):
+        with open(self.path, 'rb') as store_file:
+            store_file.seek(record[2])
+            return json.loads(store_file.read(record[3]).rstrip(b'\0'))
+
+    def read_columns(self, record):
+        """(attributes, {name: memory mapped column}) of a column record."""
+        with open(self.path, 'rb') as store_file:
+            store_file.seek(record[2])
+            meta_length = struct.unpack('<Q', store_file.read(8))[0]
+            meta = json.loads(store_file.read(meta_length))
+        offset = record[2] + 8 + meta_length + pad8(meta_length)
+        columns = {}
+        for name, dtype, length in meta['columns']:
+            dtype = np.dtype(dtype)
+            columns[name] = (np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(length,))
+                             if length else np.zeros(0, dtype=dtype))
+            offset += length * dtype.itemsize + pad8(length * dtype.itemsize)
+        return meta['attributes'], columns
+
+    def runs(self):
+        """Options header of every run, in the order they were written."""
+        return [self.read_json(record) for record in self.find(RECORD_OPTIONS)]
+
+    def summary(self, run_id):
+        records = self.find(RECORD_SUMMARY, run_id)
+        return self.read_json(records[0]) if records else None
+
+    def tables(self, run_id, table):
+        tables = []
+        for record in self.find(RECORD_COLUMNS, run_id):
+            attributes, columns = self.read_columns(record)
+            if attributes.get('table') == table:
+                tables.append((attributes, columns))
+        return tables
+
+class LiveTelemetry:
+    """Per-second statistics of a run while it is in flight.
+
+    Workers publish how many messages they have recorded, and whether they
+    are still warming up, to their row of the shared worker stats. Once a
+    second a thread in the parent reads those counters and folds the sample
+    ring entries recorded since the previous tick into a fresh histogram. The
+    result is printed (--telemetry), written as Prometheus text
+    (--telemetry_file) and/or served to every client that connects to a Unix
+    socket (--telemetry_socket).
+    """
+
+    def __init__(self, stats, samples, bits, options, args):
+        self.stats = stats
+        self.samples = samples
+        self.bits = bits
+        self.message_size = args.message_size
+        self.args = args
+        self.recorders = [process_id for process_id in range(args.process_count) if records_samples(args, process_id)]
+        self.labels = (f'transport="{options["Transport"]}",pattern="{args.message_pattern}",'
+                       f'message_size="{args.message_size}",process_count="{args.process_count}"')
+        self.seen = np.zeros(args.process_count, dtype=np.int64)
+        self.phase = np.full(args.process_count, -1, dtype=np.int64)
+        self.total_messages = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.server = None
+        if args.telemetry_socket:
+            # Only a stale socket from an earlier run is replaced, never some other file
+            if os.path.lexists(args.telemetry_socket):
+                if not stat.S_ISSOCK(os.lstat(args.telemetry_socket).st_mode):
+                    raise ValueError(f"--telemetry_socket {args.telemetry_socket} exists and is not a socket.")
+                os.unlink(args.telemetry_socket)
+            self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.server.bind(args.telemetry_socket)
+            self.server.listen()
+            self.server.setblocking(False)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.ident is not None:
+            self.thread.join()
+        if self.server:
+            self.server.close()
+            os.unlink(self.args.telemetry_socket)
+
+    def run(self):
+        start = last = time.perf_counter()
+        while not self.stop_event.wait(TELEMETRY_INTERVAL):
+            now = time.perf_counter()
+            self.export(self.sample(now - start, now - last))
+            last = now
+
+    def sample(self, elapsed, interval):
+        histogram = np.zeros(histogram_buckets(self.bits), dtype=np.int64)
+        messages = 0
+        warming_up = False
+        for process_id in self.recorders:
+            count = int(self.stats[process_id, STAT_LIVE_COUNT])
+            phase = int(self.stats[process_id, STAT_LIVE_WARMUP])
+            if phase != self.phase[process_id]:
+                # The sample ring restarts when warmup ends
+                self.phase[process_id] = phase
+                self.seen[process_id] = 0
+            warming_up |= bool(phase)
+            new = count - int(self.seen[process_id])
+            self.seen[process_id] = count
+            messages += new
+            ring = self.samples[process_id]
+            window = np.arange(count - min(new, len(ring)), count) % len(ring)
+            record_latencies(histogram, ring[window], self.bits)
+        self.total_messages += messages
+
+        latencies = histogram_statistics(histogram, self.bits)
+        return {
+            'Elapsed (s)': elapsed,
+            'Warming Up': warming_up,
+            'Messages': self.total_messages,
+            'Msg/s': messages / interval,
+            'Throughput MB/s': messages * self.message_size / interval / 1024 / 1024,
+            'P50 Latency (us)': latencies['50th Percentile (P50) Latency (us)'],
+            'P99 Latency (us)': latencies['99th Percentile (P99) Latency (us)'],
+            'Maximum Latency (us)': latencies['Maximum Latency (us)']
+        }
+
+    def prometheus(self, live):
+        lines = []
+        for name, kind, value in (
+                ('ipc_benchmark_messages_total', 'counter', live['Messages']),
+                ('ipc_benchmark_messages_per_second', 'gauge', live['Msg/s']),
+                ('ipc_benchmark_throughput_mb_per_second', 'gauge', live['Throughput MB/s']),
+                ('ipc_benchmark_warming_up', 'gauge', int(live['Warming Up']))):
+            lines.extend([f"# TYPE {name} {kind}", f"{name}{{{self.labels}}} {value}"])
+        lines.append("# TYPE ipc_benchmark_latency_us gauge")
+        for quantile, stat in (('0.5', 'P50 Latency (us)'), ('0.99', 'P99 Latency (us)'), ('1', 'Maximum Latency (us)')):
+            lines.append(f'ipc_benchmark_latency_us{{{self.labels},quantile="{quantile}"}} {live[stat]}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, live):
+        if self.args.telemetry:
+            print(f"Live {live['Elapsed (s)']:.0f}s{' (warmup)' if live['Warming Up'] else ''}: "
+                  f"{live['Msg/s']:.2f} Msg/s, {live['Throughput MB/s']:.2f} MB/s, "
+                  f"P50 {live['P50 Latency (us)']:.3f} us, P99 {live['P99 Latency (us)']:.3f} us, "
+                  f"Max {live['Maximum Latency (us)']:.3f} us", flush=True)
+        if not (self.args.telemetry_file or self.server):
+            return
+        metrics = self.prometheus(live)
+        if self.args.telemetry_file:
+            # Replace the file in one step so scrapers never read a partial page
+            temporary_path = self.args.telemetry_file + '.tmp'
+            with open(temporary_path, 'w') as metrics_file:
+                metrics_file.write(metrics)
+            os.replace(temporary_path, self.args.telemetry_file)
+        if self.server:
+            while True:
+                try:
+                    client, _ = self.server.accept()
+                except BlockingIOError:
+                    break
+                with client:
+                    client.setblocking(True)
+                    client.sendall(metrics.encode())
+
+class SampleSpooler:
+    """Streams the steady-state samples of a run into the results store while it is in flight.
+
+    Every SPOOL_INTERVAL a thread in the parent appends the samples each
+    recording worker added to its ring since the previous pass as a sample
+    block, so runs longer than a ring keep every sample and a crash loses at
+    most the last interval. Seconds that can no longer receive samples are
+    appended as per-second blocks. Samples a worker overwrote before they
+    were read, because its ring lapped within one interval, are counted in
+    the block's skipped attribute. finish() appends the rest once the
+    workers have exited and returns the per-second arrays of the whole run.
+    """
+
+    def __init__(self, counts, stats, samples, args, run_id, clock_offset_ns):
+        self.counts = counts
+        self.stats = stats
+        self.samples = samples
+        self.path = args.results_store
+        self.run_id = run_id
+        self.message_size = args.message_size
+        self.clock_offset_ns = clock_offset_ns
+        self.recorders = [process_id for process_id in range(args.process_count) if records_samples(args, process_id)]
+        self.seen = np.zeros(args.process_count, dtype=np.int64)
+        # Stored samples not yet in a per-second block, per worker
+        self.pending = [[] for _ in range(args.process_count)]
+        self.rows = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread.ident is not None:
+            self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(SPOOL_INTERVAL):
+            for process_id in self.recorders:
+                warming_up = self.stats[process_id, STAT_LIVE_WARMUP]
+                count = int(self.stats[process_id, STAT_LIVE_COUNT])
+                if warming_up or self.stats[process_id, STAT_LIVE_WARMUP]:
+                    # The ring restarts when warmup ends, only steady-state samples are stored
+                    self.seen[process_id] = 0
+                    continue
+                self.spool(process_id, count)
+            # A sample can still be in flight for the current second
+            self.append_seconds((time.time_ns() // 1000000000) - 1)
+
+    def finish(self):
+        self.stop()
+        for process_id in self.recorders:
+            self.spool(process_id, int(self.counts[process_id]))
+        self.append_seconds(None)
+        return tuple(np.concatenate(column) for column in zip(*self.rows))
+
+    def spool(self, process_id, count):
+        ring = self.samples[process_id]
+        first = max(int(self.seen[process_id]), count - len(ring))
+        if first >= count:
+            return
+        pairs = ring[np.arange(first, count) % len(ring)]
+        # Slots the worker reused while they were being copied
+        overwritten = max(0, int(self.stats[process_id, STAT_LIVE_COUNT]) - len(ring) - first)
+        pairs = pairs[overwritten:]
+        append_columns_record(self.path, self.run_id, {'start_ns': pairs[:, 0], 'end_ns': pairs[:, 1]}, table='samples',
+                              process_id=process_id, skipped=first - int(self.seen[process_id]) + overwritten)
+        self.pending[process_id].append(pairs)
+        self.seen[process_id] = count
+
+    def append_seconds(self, before_second):
+        """Append a per-second block for the pending samples that fall before before_second (all if None)."""
+        complete = []
+        for process_id, chunks in enumerate(self.pending):
+            pairs = np.concatenate(chunks) if chunks else np.zeros((0, SAMPLE_FIELDS), dtype=np.int64)
+            if before_second is None:
+                done = np.ones(len(pairs), dtype=bool)
+            else:
+                done = (pairs[:, 1] + self.clock_offset_ns) // 1000000000 < before_second
+            complete.append(pairs[done])
+            self.pending[process_id] = [pairs[~done]] if not done.all() else []
+        rows = per_second_statistics(complete, self.message_size, self.clock_offset_ns)
+        self.rows.append(rows)
+        if len(rows[0]):
+            append_columns_record(self.path, self.run_id, dict(zip(
+                ('second', 'process_id', 'latency', 'mps', 'throughput'), rows)), table='per_second')
+
+def run_ipc_benchmark(args, shared_memory=None):
     print("running ipc benchmark")
-    if args.posix and posix_ipc is None:
+    backing = segment_backing(args)
+    if backing == 'posix' and posix_ipc is None:
         raise ImportError("posix_ipc module is not available. Install it or run without POSIX shared memory.")
-
-    shared_memory = create_shared_memory(args.data_size, posix=args.posix)
-    logging.basicConfig(filename=args.log_file, level=logging.INFO, format='%(message)s')
-    data = multiprocessing.shared_memory.SharedMemory(name=shared_memory.name)
+    if args.hugepages and backing != 'memfd':
+        raise ValueError("--hugepages applies to --backing memfd; --backing hugetlbfs always uses huge pages.")
 
     if args.message_pattern == "request-response":
-        shared_data = data.buf
-        shared_data[:args.data_size * 1024 * 256] = bytes([0] * (args.data_size * 1024 * 256))
+        if args.process_count < 2 or args.process_count % 2:
+            raise ValueError("request-response needs an even --process_count of at least 2 (client/server pairs).")
+        links = args.process_count // 2
     elif args.message_pattern == "publish-subscribe":
+        if args.process_count < 2:
+            raise ValueError("publish-subscribe needs a --process_count of at least 2 (one publisher and its subscribers).")
+        if args.transport != 'shm' and args.message_size < 8:
+            raise ValueError("publish-subscribe over a point-to-point transport needs a --message_size of at least 8 bytes.")
+        links = args.process_count - 1
+    elif args.message_pattern == "mpmc":
+        if args.transport != 'shm':
+            raise ValueError("mpmc shares one queue in the shared memory segment and needs --transport shm.")
+        if args.message_size < 8:
+            raise ValueError("mpmc needs a --message_size of at least 8 bytes for the enqueue timestamp.")
+        if not 1 <= mpmc_producers(args) < args.process_count:
+            raise ValueError("mpmc needs at least one producer and one consumer; set --producers below --process_count.")
+        if args.lock == 'spin' and libatomic is None:
+            raise ImportError("libatomic is not available. Install it or use --lock semaphore or --lock mp-lock.")
+        if args.lock == 'semaphore' and posix_ipc is None:
+            raise ImportError("posix_ipc module is not available. Install it or use --lock spin or --lock mp-lock.")
+        links = None
+    if args.worker_model == 'asyncio' and (args.transport not in ASYNCIO_TRANSPORTS or args.message_pattern == "mpmc"):
+        raise ValueError(f"the asyncio worker model runs request-response and publish-subscribe over {', '.join(ASYNCIO_TRANSPORTS)}.")
+    if workers_per_process(args) < 1:
+        raise ValueError("--threads_per_process and --tasks_per_loop must be at least 1.")
+    parse_warmup(args.warmup)
+    message_limit = transport_message_limit(args.transport)
+    if message_limit is not None and args.message_size > message_limit:
+        raise ValueError(f"--transport {args.transport} carries messages of at most {message_limit} bytes on this host, lower --message_size.")
+    placement = worker_cpus(args)
+
+    if args.worker_model != 'process':
+        # The same pattern and transport with a process per worker, so the report can tell
+        # the cost of sharing a process from the cost of the transport itself
+        print("running process model baseline")
+        _, process_baseline = run_ipc_benchmark(argparse.Namespace(**dict(vars(args), worker_model='process', runs=1,
+                                                                          output_json=False)), shared_memory)
+        process_p50 = process_baseline['Aggregate Latency Statistics']['50th Percentile (P50) Latency (us)']
+
+    # A caller-provided segment is reused as is and left for the caller to unlink
+    owns_shared_memory = shared_memory is None
+    if owns_shared_memory:
+        shared_memory = create_shared_memory(args.data_size, backing, args.backing_dir, args.hugepages)
+    data = sample_memory = None
+    try:
+        logging.basicConfig(filename=args.log_file, level=logging.INFO, format='%(message)s')
+        data = attach_shared_memory(shared_memory)
+
         shared_data = data.buf[:args.data_size * 1024 * 1024]
+        transport = create_transport(args.transport, args.message_size, shared_data)
 
-    num_processes = args.process_count
-
-
-    all_results = []
-    all_agg_results = []
-    log_data = []
-    options = {
-        'Data Size (MB)': args.data_size,
-        'Duration (s)': args.duration if args.duration else 'Not Applicable',
-        'Message Count': args.message_count if args.message_count else 'Not Applicable',
-        'Log File': args.log_file,
-        'POSIX Shared Memory': args.posix,
-        'Message Size (bytes)': args.message_size,
-        'Message Pattern': args.message_pattern,
-        'Process Count': args.process_count,
-        'Output Format': 'Human-Readable' if args.human_readable else 'JSON',
-        'Runs': args.runs
-        }
+        num_processes = args.process_count
+
+
+        all_results = []
+        all_agg_results = []
+        log_data = []
+        options = {
+            'Data Size (MB)': args.data_size,
+            'Duration (s)': args.duration if args.duration else 'Not Applicable',
+            'Message Count': args.message_count if args.message_count else 'Not Applicable',
+            'Log File': args.log_file,
+            'POSIX Shared Memory': args.posix,
+            'Backing': backing,
+            'Huge Pages': args.hugepages or backing == 'hugetlbfs',
+            'Transport': args.transport,
+            'Message Size (bytes)': args.message_size,
+            'Message Size Sweep': args.message_size_sweep if args.message_size_sweep else 'Not Applicable',
+            'Message Pattern': args.message_pattern,
+            'Backpressure': args.backpressure,
+            'Producers': mpmc_producers(args) if args.message_pattern == "mpmc" else 'Not Applicable',
+            'Lock': args.lock if args.message_pattern == "mpmc" else 'Not Applicable',
+            'Worker Model': args.worker_model,
+            'Workers per Process': workers_per_process(args),
+            'Process Count': args.process_count,
+            'CPU List': effective_cpu_list(args) or 'Not Applicable',
+            'Pin Strategy': args.pin_strategy,
+            'NUMA Node': args.numa_node if args.numa_node is not None else 'Not Applicable',
+            'Worker CPUs': [sorted(cpus) for cpus in placement] if placement else 'Not Applicable',
+            'Output Format': 'Human-Readable' if args.human_readable else 'JSON',
+            'Histogram Precision (digits)': args.histogram_precision,
+            'Warmup': args.warmup if args.warmup else 'Not Applicable',
+            'Locked Memory': args.mlock,
+            'Verify Payloads': args.verify,
+            'Runs': args.runs
+            }
     
-    for run in range(args.runs):
+        capacities = sample_capacities(args)
+        bits = histogram_bits(args.histogram_precision)
+        sample_memory = create_sample_buffers(capacities, histogram_buckets(bits))
+        counts, stats, histograms, samples = attach_sample_buffers(sample_memory, capacities, histogram_buckets(bits))
+        # Merged across processes and runs; fixed size however long the runs are
+        aggregate_histogram = np.zeros(histogram_buckets(bits), dtype=np.int64)
+        aggregate_warmup_histogram = np.zeros(histogram_buckets(bits), dtype=np.int64)
+        aggregate_scheduling_histogram = np.zeros(histogram_buckets(bits), dtype=np.int64)
 
-        #latencies = []
-        #mps = []
-        #throughput = []
-        timestamps = multiprocessing.Manager().list()
-        processes = []
-        
-        start_run_time = time.time()
-        current_second = int(start_run_time)
-        second_process_data = {i: {'latencies': [], 'mps': [], 'throughput': []} for i in range(num_processes)}
-
-        #for each process start a ipc worker
-        for i in range(num_processes):
-            process = multiprocessing.Process(target=ipc_worker, args=(shared_data, i, args.message_size, args.message_pattern, args, timestamps))
-            processes.append(process)
-            process.start()
+        prefault_buffers([shared_data, sample_memory.buf],
+                         numa_node_cpus(args.numa_node) if args.numa_node is not None else None, args.mlock)
 
-        #wait for ipc workers to either time out or reach message count
-        for process in processes:
-            process.join()
-            
-        end_run_time = time.time()
-        duration_runtime = end_run_time - start_run_time 
-
-        # Calculate average per second latency, MPS, and throughput
-        avg_latency_list = []
-        avg_mps_list = []
-        avg_througput_list = []
-        print("processing sample data")
-        process_starttime = time.time()
-        message_counter = 0
-        total_message_count = 0
-        for timestamp in timestamps:
-            message_counter += 1
-            total_message_count += 1
-            latency = timestamp['end_time'] - timestamp['start_time']
-            latency = latency * 1000000
-
-            # Check if the timestamp is within the same second
-            if int(timestamp['end_time']) == current_second:
-                throughput_value = ((message_counter * args.message_size) / 1024) / 1024
-                second_process_data[timestamp['process_id']]['latencies'].append(latency)
-                second_process_data[timestamp['process_id']]['mps'].append(message_counter)
-                second_process_data[timestamp['process_id']]['throughput'].append(throughput_value)
+        # Runs of one configuration share its hash, so result sets can be matched up later
+        config_digest = config_hash(vars(args))
+        run_ids = []
+        for run in range(args.runs):
+            run_id = os.urandom(8).hex()
+            run_ids.append(run_id)
+            append_json_record(args.results_store, RECORD_OPTIONS, run_id, {
+                'Run ID': run_id,
+                'Run': run + 1,
+                'Config Hash': config_digest,
+                'Config': vars(args),
+                'Options': options
+            })
+
+            #latencies = []
+            #mps = []
+            #throughput = []
+            counts[:] = 0
+            stats[:] = 0
+            histograms[:] = 0
+            # Bound before any worker starts, so a telemetry socket that cannot be used leaves none running
+            telemetry = None
+            if args.telemetry or args.telemetry_file or args.telemetry_socket:
+                telemetry = LiveTelemetry(stats, samples, bits, options, args)
+            locks = None
+            if args.message_pattern == "mpmc":
+                transport.setup_queue()
+                locks = create_queue_locks(args.lock)
             else:
-                # Calculate averages for the current second and store results
-                throughput_value = ((message_counter * args.message_size) / 1024) / 1024
-                for process_id, cur_data in second_process_data.items():
-                    if cur_data['latencies']:
-                        avg_latency = np.mean(cur_data['latencies'])
-                        avg_mps = message_counter #np.mean(cur_data['mps'])
-                        avg_throughput = np.mean(cur_data['throughput'])
-
-                        avg_latency_list.append(avg_latency)
-                        avg_mps_list.append(avg_mps)
-                        avg_througput_list.append(avg_throughput)
-                        # Store results for the current second and process
-                        log_data.append({
-                            'capture_time': datetime.utcfromtimestamp(current_second).strftime('%Y-%m-%dT%H:%M:%S'),
-                            'process_id': process_id,
-                            'latency': avg_latency,
-                            'mps': avg_mps,
-                            'throughput': avg_throughput,
-                            'options': options
-                        })
-                        
-                        # Log the message after appending data to log_data
-                        log_message = f"{datetime.utcfromtimestamp(current_second).strftime('%Y-%m-%dT%H:%M:%S')},{process_id},{avg_latency:.6f},{avg_mps:.2f},{avg_throughput:.2f}"
-                        logging.info(log_message)
-                    
-                # Reset data for the new second
-                message_counter = 0
-                current_second = int(timestamp['end_time'])
-                second_process_data = {i: {'latencies': [latency], 'mps': [message_counter], 'throughput': [throughput_value]} for i in range(num_processes)}    
+                transport.setup(links, broadcast=args.message_pattern == "publish-subscribe")
+            processes = []
+            # Workers set up their channels, then all start measuring together
+            barrier = multiprocessing.Barrier(num_processes)
+            payloads = payload_pool(args.message_size)
         
-        print_table(log_data)
+            start_run_time = time.time()
+            # Only reaped children count, so this covers exactly this run's workers
+            usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+            #for each process start a ipc worker
+            if args.worker_model == 'process':
+                for i in range(num_processes):
+                    process = multiprocessing.Process(target=ipc_worker, args=(transport, i, args.message_size, args.message_pattern, args, sample_memory.name, capacities,
+                                                                               barrier, placement[i] if placement else None, payloads, locks))
+                    processes.append(process)
+                    process.start()
+            else:
+                # Consecutive workers share a process, so request-response pairs stay together when the group size is even
+                group_size = workers_per_process(args)
+                for first in range(0, num_processes, group_size):
+                    worker_ids = list(range(first, min(first + group_size, num_processes)))
+                    process = multiprocessing.Process(target=worker_group, args=(transport, worker_ids, args, sample_memory.name, capacities, barrier,
+                                                                                 [placement[i] for i in worker_ids] if placement else None, payloads, locks))
+                    processes.append(process)
+                    process.start()
+            transport.teardown()
+            if telemetry:
+                telemetry.start()
+            # perf_counter_ns is CLOCK_MONOTONIC, shared by all workers; map it to wall-clock seconds
+            clock_offset_ns = time.time_ns() - time.perf_counter_ns()
+            spooler = SampleSpooler(counts, stats, samples, args, run_id, clock_offset_ns)
+            spooler.start()
+
+            #wait for ipc workers to either time out or reach message count
+            try:
+                join_workers(processes)
+            finally:
+                spooler.stop()
+                if telemetry:
+                    telemetry.stop()
+            close_queue_locks(locks)
+            usage = resource_usage_delta(usage_before, resource.getrusage(resource.RUSAGE_CHILDREN))
+            
+            end_run_time = time.time()
+            duration_runtime = end_run_time - start_run_time 
+
+            # Calculate average per second latency, MPS, and throughput
+            print("processing sample data")
+            process_starttime = time.time()
+            total_message_count = int(counts.sum())
+            # The rest of the samples and seconds go to the store, the whole run comes back
+            capture_seconds, process_ids, avg_latency_list, avg_mps_list, avg_througput_list = spooler.finish()
+
+            for current_second, process_id, avg_latency, avg_mps, avg_throughput in zip(
+                    capture_seconds.tolist(), process_ids.tolist(), avg_latency_list.tolist(),
+                    avg_mps_list.tolist(), avg_througput_list.tolist()):
+                capture_time = datetime.utcfromtimestamp(current_second).strftime('%Y-%m-%dT%H:%M:%S')
+                # Store results for the current second and process
+                log_data.append({
+                    'capture_time': capture_time,
+                    'process_id': process_id,
+                    'latency': avg_latency,
+                    'mps': avg_mps,
+                    'throughput': avg_throughput
+                })
+
+                # Log the message after appending data to log_data
+                logging.info(f"{capture_time},{process_id},{avg_latency:.6f},{avg_mps:.2f},{avg_throughput:.2f}")
+
+
+            print_table(log_data)
         
-        process_endtime = time.time()
-        process_duration = process_endtime - process_starttime
-        print("completed processing data, duration: " + str(process_duration))
+            process_endtime = time.time()
+            process_duration = process_endtime - process_starttime
+            print("completed processing data, duration: " + str(process_duration))
         
-        print("starting Statistics")
-        p50_latency = np.percentile(avg_latency_list, 50)
-        p90_latency = np.percentile(avg_latency_list, 90)
-        p99_latency = np.percentile(avg_latency_list, 99)
-        average_latency = np.mean(avg_latency_list)
-
-        #throughput = list(throughput)
-        avg_mps = sum(avg_mps_list) / len(avg_mps_list)
-        avg_throughput = sum(avg_througput_list) / len(avg_througput_list)
-        max_throughput = max(avg_througput_list)
-        min_throughput = min(avg_througput_list)
-
-        lat_percent_deviation = np.std(avg_latency_list) / np.mean(avg_latency_list) * 100
-        jitter = max(avg_latency_list) - min(avg_latency_list)
-
-        summary = {
-            'Run': run + 1,  # Adding a "Run" counter
-            'Run Duration': duration_runtime,
-            'Options': options,
-            'Latency Statistics': {
-                '50th Percentile (P50) Latency (us)': p50_latency,
-                '90th Percentile (P90) Latency (us)': p90_latency,
-                '99th Percentile (P99) Latency (us)': p99_latency,
-                'Average Latency (us)': average_latency,
-                'Percent Deviation': lat_percent_deviation,
-                'Jitter (us)': jitter
-            },
-            'Throughput Statistics': {
-                'Total Message Count': total_message_count,
-                'Average Msg/s': avg_mps,
-                'Average Throughput MB/s': avg_throughput,
-                'Maximum Throughput MB/s': max_throughput,
-                'Minimum Throughput MB/s': min_throughput
-            },
-        }
-        print("Finished Statistics")
-        all_results.append(summary)
-
-        if args.human_readable:
-            print("\nIPC Benchmark Run Summary:" + str(run + 1) + " out of " + str(args.runs))
-            print("\nDuration runtime:" + str(int(duration_runtime)))
-            print("Options:")
-            for option, value in options.items():
-                print(f"{option}: {value}")
+            print("starting Statistics")
+            run_histogram = histograms[STEADY_STATE].sum(axis=0)
+            aggregate_histogram += run_histogram
+            # Unlike the sample rings the histogram covers every steady-state message, compare tests P99 on it
+            append_columns_record(args.results_store, run_id, {'count': run_histogram}, table='histogram', bits=bits)
+            warmup_histogram = histograms[WARMUP].sum(axis=0)
+            aggregate_warmup_histogram += warmup_histogram
+            scheduling_histogram = histograms[SCHEDULING].sum(axis=0)
+            aggregate_scheduling_histogram += scheduling_histogram
+            average_latency = np.mean(avg_latency_list)
+
+            #throughput = list(throughput)
+            avg_mps = sum(avg_mps_list) / len(avg_mps_list)
+            avg_throughput = sum(avg_througput_list) / len(avg_througput_list)
+            max_throughput = max(avg_througput_list)
+            min_throughput = min(avg_througput_list)
+
+            steady_state_duration = steady_state_span(stats)
+
+            lat_percent_deviation = np.std(avg_latency_list) / np.mean(avg_latency_list) * 100
+            jitter = max(avg_latency_list) - min(avg_latency_list)
+
+            summary = {
+                'Run': run + 1,  # Adding a "Run" counter
+                'Run ID': run_id,
+                'Run Duration': duration_runtime,
+                'Options': options,
+                'Latency Statistics': {
+                    **histogram_statistics(run_histogram, bits),
+                    'Average Latency (us)': average_latency,
+                    'Percent Deviation': lat_percent_deviation,
+                    'Jitter (us)': jitter
+                },
+                'Throughput Statistics': {
+                    'Total Message Count': total_message_count,
+                    'Average Msg/s': avg_mps,
+                    'Average Throughput MB/s': avg_throughput,
+                    'Maximum Throughput MB/s': max_throughput,
+                    'Minimum Throughput MB/s': min_throughput,
+                    'Steady-State Duration (s)': steady_state_duration,
+                    'Steady-State Msg/s': total_message_count / steady_state_duration if steady_state_duration else 0.0
+                },
+                'Resource Usage': usage,
+            }
+            if args.warmup:
+                summary['Warmup Statistics'] = {
+                    'Warmup Message Count': int(warmup_histogram.sum()),
+                    **histogram_statistics(warmup_histogram, bits)
+                }
+            if args.message_pattern == "publish-subscribe":
+                summary['Publish-Subscribe Statistics'] = publish_subscribe_statistics(stats, histograms[STEADY_STATE], bits, duration_runtime)
+            if args.message_pattern == "mpmc":
+                summary['Contention Statistics'] = contention_statistics(stats, mpmc_producers(args))
+            if args.worker_model != 'process':
+                summary['Worker Model Statistics'] = worker_model_statistics(
+                    scheduling_histogram, bits, summary['Latency Statistics']['50th Percentile (P50) Latency (us)'], process_p50, args)
+            if args.verify:
+                summary['Verification Statistics'] = {
+                    'Verified Messages': int(stats[:, STAT_VERIFIED].sum()),
+                    'Corrupt Messages': int(stats[:, STAT_CORRUPT].sum())
+                }
+            print("Finished Statistics")
+            all_results.append(summary)
+            append_json_record(args.results_store, RECORD_SUMMARY, run_id, summary)
+
+            if args.human_readable:
+                print("\nIPC Benchmark Run Summary:" + str(run + 1) + " out of " + str(args.runs))
+                print("\nDuration runtime:" + str(int(duration_runtime)))
+                print("Options:")
+                for option, value in options.items():
+                    print(f"{option}: {value}")
             
-            print("\nLatency Statistics:")
-            for stat, value in summary['Latency Statistics'].items():
-                print(f"{stat}: {value:.6f}")
+                print("\nLatency Statistics:")
+                for stat, value in summary['Latency Statistics'].items():
+                    print(f"{stat}: {value:.6f}")
     
-            print("\nThroughput Statistics:")
-            for stat, value in summary['Throughput Statistics'].items():
-                print(f"{stat}: {value:.2f}")
-        
-    shared_data = None
-    shared_memory.close()
-    shared_memory.unlink()
+                print("\nThroughput Statistics:")
+                for stat, value in summary['Throughput Statistics'].items():
+                    print(f"{stat}: {value:.2f}")
+
+                print("\nResource Usage:")
+                for stat, value in summary['Resource Usage'].items():
+                    print(f"{stat}: {value}")
+
+                if 'Warmup Statistics' in summary:
+                    print("\nWarmup Statistics:")
+                    for stat, value in summary['Warmup Statistics'].items():
+                        print(f"{stat}: {format_statistic(value, '.6f')}")
+
+                if 'Publish-Subscribe Statistics' in summary:
+                    print("\nPublisher Statistics:")
+                    for stat, value in summary['Publish-Subscribe Statistics']['Publisher'].items():
+                        print(f"{stat}: {format_statistic(value, '.2f')}")
+                    for subscriber in summary['Publish-Subscribe Statistics']['Subscribers']:
+                        print(f"\nSubscriber {subscriber['Subscriber']} Statistics:")
+                        for stat, value in subscriber.items():
+                            if stat != 'Subscriber':
+                                print(f"{stat}: {format_statistic(value, '.2f')}")
+
+                if 'Worker Model Statistics' in summary:
+                    print("\nWorker Model Statistics:")
+                    for stat, value in summary['Worker Model Statistics'].items():
+                        print(f"{stat}: {format_statistic(value, '.2f')}")
+
+                if 'Contention Statistics' in summary:
+                    print("\nContention Statistics:")
+                    for stat, value in summary['Contention Statistics'].items():
+                        print(f"{stat}: {format_statistic(value, '.2f')}")
+
+                if 'Verification Statistics' in summary:
+                    print("\nVerification Statistics:")
+                    for stat, value in summary['Verification Statistics'].items():
+                        print(f"{stat}: {value}")
+    finally:
+        # Also runs when a run fails, so no segment, and no hugetlbfs page reservation, outlives it
+        shared_data = transport = telemetry = spooler = counts = stats = histograms = samples = None
+        failed = sys.exc_info()[1] is not None
+        if owns_shared_memory:
+            shared_memory.unlink()
+        if sample_memory is not None:
+            sample_memory.unlink()
+        for segment in (data, shared_memory if owns_shared_memory else None, sample_memory):
+            if segment is None:
+                continue
+            try:
+                segment.close()
+            except BufferError:
+                # The traceback of a failed run may still hold views of the segment
+                if not failed:
+                    raise
 
     aggregate_summary = {
         'Options': options,
         'Aggregate Latency Statistics': {
-            '50th Percentile (P50) Latency (us)': np.percentile([run['Latency Statistics']['50th Percentile (P50) Latency (us)'] for run in all_results], 50),
-            '90th Percentile (P90) Latency (us)': np.percentile([run['Latency Statistics']['90th Percentile (P90) Latency (us)'] for run in all_results], 90),
-            '99th Percentile (P99) Latency (us)': np.percentile([run['Latency Statistics']['99th Percentile (P99) Latency (us)'] for run in all_results], 99),
+            **histogram_statistics(aggregate_histogram, bits),
             'Average Latency (us)': np.mean([run['Latency Statistics']['Average Latency (us)'] for run in all_results]),
             'Aggregate Percent Deviation': np.mean([run['Latency Statistics']['Percent Deviation'] for run in all_results]),
             'Aggregate Jitter (us)': np.mean([run['Latency Statistics']['Jitter (us)'] for run in all_results])
@@ -338,9 +2575,42 @@ def run_ipc_benchmark(args):
             'Maximum Throughput MB/s': np.max([run['Throughput Statistics']['Maximum Throughput MB/s'] for run in all_results]),
             'Minimum Throughput MB/s': np.min([run['Throughput Statistics']['Minimum Throughput MB/s'] for run in all_results])
         },
+        'Aggregate Resource Usage': {
+            f"Average {stat}": np.mean([run['Resource Usage'][stat] for run in all_results]) for stat in all_results[0]['Resource Usage']
+        },
         }
     
+    if args.warmup:
+        aggregate_summary['Aggregate Warmup Latency Statistics'] = histogram_statistics(aggregate_warmup_histogram, bits)
+
+    if args.message_pattern == "publish-subscribe":
+        pubsub_runs = [run['Publish-Subscribe Statistics'] for run in all_results]
+        aggregate_summary['Aggregate Publish-Subscribe Statistics'] = {
+            'Average Publish Msg/s': np.mean([run['Publisher']['Publish Msg/s'] for run in pubsub_runs]),
+            'Average Publisher Stalls': np.mean([run['Publisher']['Stalls'] for run in pubsub_runs]),
+            'Average Dropped Messages': np.mean([sum(sub['Dropped Messages'] for sub in run['Subscribers']) for run in pubsub_runs]),
+            'Maximum Subscriber P99 Latency (us)': np.max([sub['99th Percentile (P99) Latency (us)'] for run in pubsub_runs for sub in run['Subscribers']])
+        }
+
+    if args.worker_model != 'process':
+        aggregate_summary['Aggregate Worker Model Statistics'] = worker_model_statistics(
+            aggregate_scheduling_histogram, bits, aggregate_summary['Aggregate Latency Statistics']['50th Percentile (P50) Latency (us)'],
+            process_p50, args)
+
+    if args.message_pattern == "mpmc":
+        contention_runs = [run['Contention Statistics'] for run in all_results]
+        aggregate_summary['Aggregate Contention Statistics'] = {
+            stat: np.mean([run[stat] for run in contention_runs]) for stat in contention_runs[0]
+        }
+
+    if args.verify:
+        aggregate_summary['Aggregate Verification Statistics'] = {
+            'Total Verified Messages': sum(run['Verification Statistics']['Verified Messages'] for run in all_results),
+            'Total Corrupt Messages': sum(run['Verification Statistics']['Corrupt Messages'] for run in all_results)
+        }
+
     all_agg_results.append(aggregate_summary)
+    append_json_record(args.results_store, RECORD_AGGREGATE, config_digest, {'Run IDs': run_ids, **aggregate_summary})
             
     if args.human_readable:
         print("\nAggregate Statistics Across All Runs:")
@@ -356,6 +2626,35 @@ def run_ipc_benchmark(args):
         print("\nAggregate Throughput Statistics:")
         for stat, value in aggregate_summary['Aggregate Throughput Statistics'].items():
             print(f"{stat}: {value:.2f}")
+
+        print("\nAggregate Resource Usage:")
+        for stat, value in aggregate_summary['Aggregate Resource Usage'].items():
+            print(f"{stat}: {value:.2f}")
+
+        if 'Aggregate Warmup Latency Statistics' in aggregate_summary:
+            print("\nAggregate Warmup Latency Statistics:")
+            for stat, value in aggregate_summary['Aggregate Warmup Latency Statistics'].items():
+                print(f"{stat}: {value:.6f} us")
+
+        if 'Aggregate Publish-Subscribe Statistics' in aggregate_summary:
+            print("\nAggregate Publish-Subscribe Statistics:")
+            for stat, value in aggregate_summary['Aggregate Publish-Subscribe Statistics'].items():
+                print(f"{stat}: {value:.2f}")
+
+        if 'Aggregate Worker Model Statistics' in aggregate_summary:
+            print("\nAggregate Worker Model Statistics:")
+            for stat, value in aggregate_summary['Aggregate Worker Model Statistics'].items():
+                print(f"{stat}: {format_statistic(value, '.2f')}")
+
+        if 'Aggregate Contention Statistics' in aggregate_summary:
+            print("\nAggregate Contention Statistics:")
+            for stat, value in aggregate_summary['Aggregate Contention Statistics'].items():
+                print(f"{stat}: {value:.2f}")
+
+        if 'Aggregate Verification Statistics' in aggregate_summary:
+            print("\nAggregate Verification Statistics:")
+            for stat, value in aggregate_summary['Aggregate Verification Statistics'].items():
+                print(f"{stat}: {value}")
     
     if args.output_json:
         with open('ipc_benchmark_results.json', 'w') as json_file:
@@ -365,12 +2664,497 @@ def run_ipc_benchmark(args):
         with open('ipc_benchmark_aggregate_results.json', 'w') as json_file:
             json.dump(all_agg_results, json_file, indent=4)
 
-        # Dump log_data into JSON log file
-    with open('ipc_benchmark_log.json', 'w') as json_log_file:
-        json.dump(log_data, json_log_file, indent=4)
+    return all_results, aggregate_summary
+
+def parse_size(size):
+    """Bytes in a size such as "64", "4K" or "16M" (binary multiples)."""
+    size = str(size).strip().upper()
+    multiplier = SIZE_SUFFIXES.get(size[-1:], 1)
+    return int(size[:-1] if size[-1:] in SIZE_SUFFIXES else size) * multiplier
+
+def parse_size_sweep(sweep):
+    """Expand "start:stop:step" into message sizes; "x2" steps multiply, plain steps add."""
+    start, stop, step = str(sweep).split(':')
+    size, stop = parse_size(start), parse_size(stop)
+    multiply = step.lower().startswith('x')
+    step = int(step[1:]) if multiply else parse_size(step)
+    # Sizes that cannot grow would never reach stop
+    if size < 1 or step < (2 if multiply else 1):
+        raise ValueError(f"--message_size_sweep {sweep} needs a start of at least 1 and a step above x1 or 0.")
+    sizes = []
+    while size <= stop:
+        sizes.append(size)
+        size = size * step if multiply else size + step
+    if len(sizes) < 2 or sizes[-1] <= sizes[0]:
+        raise ValueError(f"--message_size_sweep {sweep} must produce at least two increasing sizes.")
+    return sizes
+
+def host_cache_sizes():
+    """Data and unified cache sizes in bytes of CPU 0, keyed like "L1d" or "L2"."""
+    caches = {}
+    for index in sorted(glob.glob('/sys/devices/system/cpu/cpu0/cache/index*')):
+        with open(os.path.join(index, 'type')) as type_file, open(os.path.join(index, 'level')) as level_file, \
+                open(os.path.join(index, 'size')) as size_file:
+            cache_type, level, size = type_file.read().strip(), level_file.read().strip(), size_file.read().strip()
+        if cache_type != 'Instruction':
+            caches[f"L{level}{'d' if cache_type == 'Data' else ''}"] = parse_size(size)
+    return caches
+
+def find_knees(sizes, latencies, throughputs):
+    """Cache and bandwidth knees of a message size curve.
+
+    A cache knee is a size after which the latency cost of each extra byte
+    grows by KNEE_SLOPE_FACTOR or more compared to the segment before it,
+    which is what falling out of a cache level looks like. The bandwidth knee
+    is the smallest size that reaches BANDWIDTH_KNEE_FRACTION of the peak
+    throughput.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    slopes = np.diff(np.asarray(latencies, dtype=float)) / np.diff(sizes)
+    cache_knees = [int(sizes[i]) for i in range(1, len(slopes))
+                   if slopes[i - 1] > 0 and slopes[i] >= KNEE_SLOPE_FACTOR * slopes[i - 1]]
+    throughputs = np.asarray(throughputs, dtype=float)
+    saturated = np.flatnonzero(throughputs >= BANDWIDTH_KNEE_FRACTION * throughputs.max())
+    return {
+        'Cache Knees (bytes)': cache_knees,
+        'Bandwidth Knee (bytes)': int(sizes[saturated[0]]),
+        'Peak Throughput MB/s': float(throughputs.max())
+    }
+
+def run_message_size_sweep(args):
+    """Run the benchmark once per --message_size_sweep size on one shared segment and fit a latency/bandwidth curve."""
+    sizes = parse_size_sweep(args.message_size_sweep)
+    # A request-response round trip carries the message both ways
+    directions = 2 if args.message_pattern == "request-response" else 1
+    shared_memory = create_shared_memory(args.data_size, segment_backing(args), args.backing_dir, args.hugepages)
+    size_results = []
+    curve = []
+    try:
+        for size in sizes:
+            size_args = argparse.Namespace(**dict(vars(args), message_size=size))
+            all_results, aggregate_summary = run_ipc_benchmark(size_args, shared_memory)
+            size_results.append(aggregate_summary)
+            latency = aggregate_summary['Aggregate Latency Statistics']
+            curve.append({
+                'Message Size (bytes)': size,
+                'P50 Latency (us)': latency['50th Percentile (P50) Latency (us)'],
+                'P99 Latency (us)': latency['99th Percentile (P99) Latency (us)'],
+                'Average Latency (us)': latency['Average Latency (us)'],
+                'Msg/s': np.mean([run['Throughput Statistics']['Steady-State Msg/s'] for run in all_results]),
+                # Bytes moved over the steady-state span rather than the per-second averages
+                'Throughput MB/s': np.mean([run['Throughput Statistics']['Steady-State Msg/s'] * size * directions
+                                            for run in all_results]) / 1024 / 1024
+            })
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+    knees = find_knees(sizes, [point['P50 Latency (us)'] for point in curve], [point['Throughput MB/s'] for point in curve])
+    knees['Host Caches (bytes)'] = host_cache_sizes()
+
+    print("\nMessage Size Curve:")
+    print(','.join(curve[0]))
+    for point in curve:
+        print(','.join(f"{value:.3f}" if isinstance(value, float) else str(value) for value in point.values()))
+    print("\nKnees:")
+    for knee, value in knees.items():
+        print(f"{knee}: {value}")
+
+    with open('ipc_benchmark_size_sweep.csv', 'w', newline='') as curve_file:
+        writer = csv.DictWriter(curve_file, fieldnames=list(curve[0]))
+        writer.writeheader()
+        writer.writerows(curve)
+
+    return size_results, {'Options': size_results[0]['Options'], 'Message Size Curve': curve, 'Knees': knees}
+
+def run_benchmark(args):
+    if args.message_size_sweep:
+        return run_message_size_sweep(args)
+    return run_ipc_benchmark(args)
+
+def config_hash(config):
+    """Stable hash of the options of one sweep permutation that affect its results."""
+    relevant = {option: value for option, value in config.items() if option not in SWEEP_IGNORED_OPTIONS}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def load_sweep_results(path):
+    """Completed permutations from a sweep results file, keyed by config hash."""
+    completed = {}
+    if path and os.path.exists(path):
+        with open(path) as results_file:
+            for line in results_file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line cut short by an interrupted sweep
+                completed[entry['Config Hash']] = entry
+    return completed
+
+def record_sweep_result(path, completed, digest, config, results):
+    all_results, aggregate_summary = results
+    entry = {'Config Hash': digest, 'Config': config, 'Results': all_results, 'Aggregate': aggregate_summary}
+    completed[digest] = entry
+    if path:
+        # One line per permutation, flushed right away so an interrupted sweep can resume
+        with open(path, 'a') as results_file:
+            results_file.write(json.dumps(entry) + '\n')
+            results_file.flush()
+            os.fsync(results_file.fileno())
+
+def sweep_worker(config, connection):
+    connection.send(run_benchmark(argparse.Namespace(**config)))
+    connection.close()
+
+def run_packed_sweep(pending, results_path, completed):
+    """Run permutations side by side on disjoint CPU sets.
+
+    Each permutation needs process_count CPUs. Pending permutations are
+    started first-fit on the lowest free CPUs, in topology order so a job
+    stays within a socket where it can. The job runs confined to those
+    CPUs through sweep_cpus, which config hashes ignore, so its results are
+    stored under the same hash as a sequential run of the permutation.
+    Permutations that choose their own placement (cpu_list, numa_node or a
+    pin_strategy, which needs whole cores and sockets rather than the lowest
+    free CPUs), or need more CPUs than the host has, run alone.
+    """
+    available = [cpu for _, _, cpu in sorted(cpu_topology(os.sched_getaffinity(0)))]
+    free = list(available)
+    running = {}
+    queue = list(pending)
+    while queue or running:
+        for digest, config in list(queue):
+            if any(job['exclusive'] for job in running.values()):
+                break
+            exclusive = (bool(config.get('cpu_list')) or config.get('numa_node') is not None
+                         or config.get('pin_strategy', 'none') != 'none'
+                         or config['process_count'] > len(available))
+            if exclusive:
+                if running:
+                    continue
+                cpus = []
+            elif config['process_count'] <= len(free):
+                cpus, free = free[:config['process_count']], free[config['process_count']:]
+            else:
+                continue
+            queue.remove((digest, config))
+            job_config = dict(config, sweep_cpus=','.join(map(str, cpus))) if cpus else config
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=sweep_worker, args=(job_config, sender))
+            process.start()
+            sender.close()
+            print(f"started permutation {digest} on CPUs {cpus if cpus else 'all'}")
+            running[receiver] = {'process': process, 'digest': digest, 'config': config,
+                                 'cpus': cpus, 'exclusive': exclusive}
+
+        for receiver in multiprocessing.connection.wait(list(running)):
+            job = running.pop(receiver)
+            try:
+                record_sweep_result(results_path, completed, job['digest'], job['config'], receiver.recv())
+            except EOFError:
+                print(f"permutation {job['digest']} failed")
+            receiver.close()
+            job['process'].join()
+            free = sorted(free + job['cpus'], key=available.index)
+
+def print_sweep_table(permutations, completed, path):
+    """One row per permutation with the options that vary across the sweep and its aggregate statistics."""
+    # Message size sweeps report a curve instead of aggregate statistics
+    entries = [completed[config_hash(config)] for config in permutations
+               if config_hash(config) in completed and 'Aggregate Latency Statistics' in completed[config_hash(config)]['Aggregate']]
+    if not entries:
+        return
+    varying = [option for option in permutations[0]
+               if option not in SWEEP_IGNORED_OPTIONS and len({json.dumps(config.get(option), default=str) for config in permutations}) > 1]
+    columns = [('Latency', stat) for stat in ('50th Percentile (P50) Latency (us)', '99th Percentile (P99) Latency (us)',
+                                               '99.9th Percentile (P99.9) Latency (us)', 'Maximum Latency (us)')]
+    columns += [('Throughput', stat) for stat in ('Average Msg/s', 'Average Throughput MB/s')]
+    header = ['Config Hash'] + varying + [stat for _, stat in columns]
+    rows = []
+    for entry in entries:
+        aggregate = entry['Aggregate']
+        row = [entry['Config Hash']] + [entry['Config'].get(option) for option in varying]
+        row += [f"{aggregate[f'Aggregate {section} Statistics'][stat]:.3f}" for section, stat in columns]
+        rows.append(row)
+
+    print("\nSweep Results:")
+    print(','.join(header))
+    for row in rows:
+        print(','.join(map(str, row)))
+    with open(path, 'w', newline='') as table_file:
+        writer = csv.writer(table_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+def run_sweep(permutations, results_path=None, parallel=False, rerun=False):
+    """Run every permutation, skipping those already in results_path unless rerun is set."""
+    completed = {} if rerun else load_sweep_results(results_path)
+    pending = []
+    for config in permutations:
+        digest = config_hash(config)
+        if digest in completed:
+            print(f"skipping permutation {digest}, results already in {results_path}")
+        elif (digest, config) not in pending:
+            pending.append((digest, config))
+
+    if parallel:
+        run_packed_sweep(pending, results_path, completed)
+    else:
+        for digest, config in pending:
+            record_sweep_result(results_path, completed, digest, config, run_benchmark(argparse.Namespace(**config)))
+
+    if len(permutations) > 1:
+        table_path = os.path.splitext(results_path)[0] + '.csv' if results_path else 'ipc_benchmark_sweep.csv'
+        print_sweep_table(permutations, completed, table_path)
+
+def report(store_path, run_id=None, per_second=False):
+    """Print the runs recorded in a results store, or one run in detail."""
+    store = ResultsStore(store_path)
+    if run_id is None:
+        header = ['Run ID', 'Run', 'Config Hash', 'Transport', 'Message Pattern', 'Message Size', 'Process Count',
+                  'P50 Latency (us)', 'P99 Latency (us)', 'Average Msg/s']
+        print(','.join(header))
+        for run in store.runs():
+            summary = store.summary(run['Run ID'])
+            row = [run['Run ID'], run['Run'], run['Config Hash'], run['Config'].get('transport'),
+                   run['Config']['message_pattern'], run['Config']['message_size'], run['Config']['process_count']]
+            if summary:
+                latency = summary['Latency Statistics']
+                row.extend([f"{latency['50th Percentile (P50) Latency (us)']:.3f}",
+                            f"{latency['99th Percentile (P99) Latency (us)']:.3f}",
+                            f"{summary['Throughput Statistics']['Average Msg/s']:.2f}"])
+            else:
+                # The run was interrupted before its summary was written
+                row.extend(['', '', ''])
+            print(','.join(map(str, row)))
+        return
+
+    runs = [run for run in store.runs() if run['Run ID'] == run_id]
+    if not runs:
+        raise ValueError(f"Run {run_id} is not in {store_path}.")
+    print(f"Run ID: {run_id}")
+    print(f"Config Hash: {runs[0]['Config Hash']}")
+    print("Options:")
+    for option, value in runs[0]['Options'].items():
+        print(f"{option}: {value}")
+
+    summary = store.summary(run_id)
+    if summary:
+        for section, values in summary.items():
+            if isinstance(values, dict) and section != 'Options':
+                print(f"\n{section}:")
+                for stat, value in values.items():
+                    print(f"{stat}: {value}")
+
+    print("\nStored Samples:")
+    stored, skipped = {}, {}
+    for attributes, columns in store.tables(run_id, 'samples'):
+        # Runs stream their samples in blocks, several per process
+        process_id = attributes['process_id']
+        stored[process_id] = stored.get(process_id, 0) + len(columns['start_ns'])
+        skipped[process_id] = skipped.get(process_id, 0) + attributes.get('skipped', 0)
+    for process_id in sorted(stored):
+        print(f"Process {process_id}: {stored[process_id]}" +
+              (f" ({skipped[process_id]} skipped)" if skipped[process_id] else ''))
+
+    if per_second:
+        print()
+        rows = []
+        for attributes, columns in store.tables(run_id, 'per_second'):
+            rows.extend([{
+                'capture_time': datetime.utcfromtimestamp(second).strftime('%Y-%m-%dT%H:%M:%S'),
+                'process_id': process_id, 'latency': latency, 'mps': mps, 'throughput': throughput
+            } for second, process_id, latency, mps, throughput in zip(
+                columns['second'].tolist(), columns['process_id'].tolist(), columns['latency'].tolist(),
+                columns['mps'].tolist(), columns['throughput'].tolist())])
+        print_table(rows)
+
+def report_main(argv):
+    parser = argparse.ArgumentParser(prog='ipc_benchmark.py report', description='Report on an IPC benchmark results store.')
+    parser.add_argument('store', nargs='?', default=CONFIG_DEFAULTS['results_store'], help='Results store to read.')
+    parser.add_argument('--run', type=str, help='Run ID to show in detail.')
+    parser.add_argument('--per_second', action='store_true', help='With --run, also print the per-second table.')
+    args = parser.parse_args(argv)
+    report(args.store, args.run, args.per_second)
+
+def reservoir_add(reservoir, values, max_samples, rng):
+    """Fold values into a (keys, values) reservoir holding a uniform random subset of at most max_samples.
+
+    Every value gets a random key and the reservoir keeps the smallest keys,
+    so the subset is uniform over everything added so far.
+    """
+    keys = np.concatenate((reservoir[0], rng.random(len(values))))
+    kept = np.concatenate((reservoir[1], values))
+    if len(kept) > max_samples:
+        smallest = np.argpartition(keys, max_samples)[:max_samples]
+        keys, kept = keys[smallest], kept[smallest]
+    return keys, kept
+
+def load_result_set(path, max_samples, rng):
+    """Latency histogram, latency samples (us) and per-run Msg/s of every configuration in a results store, keyed by config hash.
+
+    The steady-state histograms of all runs are merged, so P99 covers every
+    message; it is None when a run stored none. The samples cover what was
+    streamed from the worker rings and are uniformly subsampled beyond
+    max_samples. The memory-mapped sample columns are read
+    COMPARE_CHUNK_SAMPLES at a time into a reservoir, so comparing multi-GB
+    stores stays bounded in memory. Msg/s is the steady-state rate of each
+    run; stores without it fall back to the span of the stored samples.
+    """
+    store = ResultsStore(path)
+    result_set = {}
+    for run in store.runs():
+        entry = result_set.setdefault(run['Config Hash'], {'Config': run['Config'], 'Latencies': (np.zeros(0), np.zeros(0)),
+                                                           'Histogram': 0, 'Bits': None, 'Throughput': []})
+        retained, first_ns, last_ns = 0, [], []
+        for _, columns in store.tables(run['Run ID'], 'samples'):
+            for first in range(0, len(columns['start_ns']), COMPARE_CHUNK_SAMPLES):
+                chunk = slice(first, first + COMPARE_CHUNK_SAMPLES)
+                latencies = (columns['end_ns'][chunk] - columns['start_ns'][chunk]) / 1000
+                entry['Latencies'] = reservoir_add(entry['Latencies'], latencies, max_samples, rng)
+            if len(columns['end_ns']):
+                retained += len(columns['end_ns'])
+                first_ns.append(int(columns['end_ns'][0]))
+                last_ns.append(int(columns['end_ns'][-1]))
+        histograms = store.tables(run['Run ID'], 'histogram')
+        if histograms and entry['Histogram'] is not None:
+            attributes, columns = histograms[0]
+            entry['Histogram'] = entry['Histogram'] + np.asarray(columns['count'])
+            entry['Bits'] = attributes['bits']
+        else:
+            entry['Histogram'] = None
+        summary = store.summary(run['Run ID']) or {}
+        rate = summary.get('Throughput Statistics', {}).get('Steady-State Msg/s')
+        if rate is None and retained and max(last_ns) > min(first_ns):
+            rate = retained / ((max(last_ns) - min(first_ns)) / 1000000000)
+        if rate is not None:
+            entry['Throughput'].append(rate)
+    for entry in result_set.values():
+        entry['Latencies'] = entry['Latencies'][1]
+        entry['Throughput'] = np.array(entry['Throughput'])
+    return result_set
+
+def bootstrap_change(baseline, candidate, statistic, resamples, confidence, rng, resample=None):
+    """Relative change (%) of statistic from baseline to candidate with its bootstrap confidence interval.
+
+    Values are resampled with replacement unless resample draws a bootstrap
+    replicate some other way, e.g. from the counts of a histogram.
+    """
+    resample = resample or (lambda values: rng.choice(values, len(values)))
+    changes = np.empty(resamples)
+    for index in range(resamples):
+        baseline_value = statistic(resample(baseline))
+        candidate_value = statistic(resample(candidate))
+        changes[index] = (candidate_value / baseline_value - 1) * 100 if baseline_value else 0.0
+    tail = (1 - confidence) / 2 * 100
+    change = (statistic(candidate) / statistic(baseline) - 1) * 100 if statistic(baseline) else 0.0
+    return change, np.percentile(changes, tail), np.percentile(changes, 100 - tail)
+
+def mann_whitney_p(baseline, candidate):
+    """Two-sided Mann-Whitney U p-value, normal approximation with tie correction."""
+    n1, n2 = len(baseline), len(candidate)
+    values, inverse, ties = np.unique(np.concatenate((baseline, candidate)), return_inverse=True, return_counts=True)
+    # Tied values share the average of the ranks they span
+    ranks = (np.cumsum(ties) - (ties - 1) / 2)[inverse]
+    u = ranks[:n1].sum() - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    return math.erfc(abs(u - n1 * n2 / 2) / math.sqrt(2 * variance))
+
+def compare(baseline_path, candidate_path, threshold, confidence=0.95, resamples=1000):
+    """Compare matching configurations of two results stores.
+
+    A configuration regresses when its P99 latency grows, or its Msg/s
+    drops, by more than threshold percent and the bootstrap confidence
+    interval of that change lies entirely beyond zero. P99 is bootstrapped
+    from the merged histograms by drawing multinomial counts, Msg/s from the
+    steady-state rates of the runs. Returns the number of regressions and
+    whether the comparison was incomplete: no configuration matched, or a
+    matched one had no samples to test.
+    """
+    rng = np.random.default_rng(0)
+    baseline = load_result_set(baseline_path, COMPARE_MAX_SAMPLES, rng)
+    candidate = load_result_set(candidate_path, COMPARE_MAX_SAMPLES, rng)
+    matched = [digest for digest in baseline if digest in candidate]
+    p99 = lambda latencies: np.percentile(latencies, 99)
+
+    header = ['Config Hash', 'Transport', 'Message Pattern', 'Message Size', 'Process Count',
+              'Baseline P99 (us)', 'Candidate P99 (us)', 'P99 Change (%)', 'P99 CI Low (%)', 'P99 CI High (%)',
+              'Baseline Msg/s', 'Candidate Msg/s', 'Msg/s Change (%)', 'Msg/s CI Low (%)', 'Msg/s CI High (%)',
+              'Mann-Whitney p', 'Verdict']
+    print(','.join(header))
+    regressions = 0
+    unsampled = 0
+    for digest in matched:
+        config = baseline[digest]['Config']
+        row = [digest, config.get('transport'), config['message_pattern'], config['message_size'], config['process_count']]
+        base, cand = baseline[digest], candidate[digest]
+        if not (len(base['Latencies']) and len(cand['Latencies']) and len(base['Throughput']) and len(cand['Throughput'])):
+            print(','.join(map(str, row + [''] * (len(header) - len(row) - 1) + ['No Samples'])))
+            unsampled += 1
+            continue
+        if base['Histogram'] is not None and cand['Histogram'] is not None and base['Bits'] == cand['Bits']:
+            bits = base['Bits']
+            p99_latency = lambda histogram: histogram_statistics(histogram, bits)['99th Percentile (P99) Latency (us)']
+            draw = lambda histogram: rng.multinomial(histogram.sum(), histogram / histogram.sum())
+            latency_change, latency_low, latency_high = bootstrap_change(base['Histogram'], cand['Histogram'], p99_latency,
+                                                                         resamples, confidence, rng, draw)
+            base_p99, cand_p99 = p99_latency(base['Histogram']), p99_latency(cand['Histogram'])
+        else:
+            # Stores written before runs kept their histogram only have the retained samples
+            latency_change, latency_low, latency_high = bootstrap_change(base['Latencies'], cand['Latencies'], p99,
+                                                                         resamples, confidence, rng)
+            base_p99, cand_p99 = p99(base['Latencies']), p99(cand['Latencies'])
+        throughput_change, throughput_low, throughput_high = bootstrap_change(base['Throughput'], cand['Throughput'],
+                                                                              np.mean, resamples, confidence, rng)
+        verdicts = []
+        if latency_change > threshold and latency_low > 0:
+            verdicts.append('P99 Regression')
+        if throughput_change < -threshold and throughput_high < 0:
+            verdicts.append('Throughput Regression')
+        regressions += bool(verdicts)
+        row += [f"{base_p99:.3f}", f"{cand_p99:.3f}",
+                f"{latency_change:.2f}", f"{latency_low:.2f}", f"{latency_high:.2f}",
+                f"{np.mean(base['Throughput']):.2f}", f"{np.mean(cand['Throughput']):.2f}",
+                f"{throughput_change:.2f}", f"{throughput_low:.2f}", f"{throughput_high:.2f}",
+                f"{mann_whitney_p(base['Latencies'], cand['Latencies']):.4g}", ' and '.join(verdicts) or 'OK']
+        print(','.join(map(str, row)))
+
+    for name, result_set, other in (('baseline', baseline, candidate), ('candidate', candidate, baseline)):
+        for digest in result_set:
+            if digest not in other:
+                print(f"Config {digest} is only in the {name}, not compared.")
+    print(f"\n{len(matched) - unsampled} configurations compared, {regressions} regressed beyond {threshold}%.")
+    if not matched:
+        print("No configuration is in both results stores, nothing was compared.")
+    elif unsampled:
+        print(f"{unsampled} matching configurations had no samples and were not compared.")
+    return regressions, not matched or bool(unsampled)
+
+def compare_main(argv):
+    parser = argparse.ArgumentParser(prog='ipc_benchmark.py compare', description='Compare two IPC benchmark results stores and fail on regressions.')
+    parser.add_argument('baseline', help='Results store of the baseline.')
+    parser.add_argument('candidate', help='Results store to check against the baseline.')
+    parser.add_argument('--threshold', type=float, default=5.0, help='Regression threshold (percent) for P99 latency growth or Msg/s loss.')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Confidence level of the bootstrap intervals.')
+    parser.add_argument('--resamples', type=int, default=1000, help='Bootstrap resamples per statistic.')
+    args = parser.parse_args(argv)
+    regressions, incomplete = compare(args.baseline, args.candidate, args.threshold, args.confidence, args.resamples)
+    if regressions:
+        sys.exit(1)
+    if incomplete:
+        sys.exit(COMPARE_INCOMPLETE_STATUS)
 
 def main():
     
+    if sys.argv[1:2] == ['report']:
+        report_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ['compare']:
+        compare_main(sys.argv[2:])
+        return
+
     print(sys.version)
     parser = argparse.ArgumentParser(description='IPC Benchmark with Data Size, Duration, Logging, Shared Memory, Message Size, Process Count, Message Pattern, Message Count, Number of Runs, and Output JSON Options')
     parser.add_argument('--config', type=str, help='Path to the YAML config file. It allows specifying multiple values for each option.')
@@ -379,16 +3163,41 @@ def main():
     group = parser.add_mutually_exclusive_group()
     group.add_argument('--yaml', type=str, help='Path to the YAML config file (alternative to --config)')
     
+    parser.add_argument('--sweep_results', type=str, help='Sweep Results. JSON lines file that records every finished permutation; permutations already in it are skipped, so an interrupted sweep resumes.')
+    parser.add_argument('--sweep_parallel', action='store_true', help='Parallel Sweep. Run independent permutations side by side on disjoint CPU sets when they fit.')
+    parser.add_argument('--rerun', action='store_true', help='Rerun. Ignore results already recorded in --sweep_results.')
     parser.add_argument('--data_size', type=int, help='Data Size (in MB). The size of the shared memory.')
     parser.add_argument('--duration', type=int, help='Duration (in seconds). The time to run the benchmark.')
     parser.add_argument('--log_file', type=str, help='Log File. The file to store benchmark logs.')
     parser.add_argument('--posix', action='store_true', help='Use POSIX Shared Memory. Use POSIX shared memory instead of multiprocessing shared memory.')
+    parser.add_argument('--backing', choices=['shm', 'posix', 'hugetlbfs', 'memfd', 'file-mmap'], default='shm', help='Backing. What backs the shared memory segment: multiprocessing shared memory, posix_ipc, a file on hugetlbfs, a memfd or an mmap\'d file.')
+    parser.add_argument('--backing_dir', type=str, help='Backing Directory. Where hugetlbfs and file-mmap segments create their file (defaults to /dev/hugepages and the temporary directory).')
+    parser.add_argument('--hugepages', action='store_true', help='Huge Pages. Back a memfd segment with huge pages (MFD_HUGETLB).')
+    parser.add_argument('--transport', choices=list(TRANSPORTS), default='shm', help='Transport. How messages move between processes: shared memory rings (default), pipes, sockets, POSIX message queues or multiprocessing queues/pipes.')
     parser.add_argument('--message_size', type=int, help='Message Size (in bytes). The size of each message.')
-    parser.add_argument('--message_pattern', choices=['request-response', 'publish-subscribe'], help='Message Pattern. The communication pattern between processes.')
+    parser.add_argument('--message_size_sweep', type=str, help='Message Size Sweep. Run every size in start:stop:step (e.g. 64:16M:x2) on one shared segment and report a latency/bandwidth curve with its knees.')
+    parser.add_argument('--message_pattern', choices=['request-response', 'publish-subscribe', 'mpmc'], help='Message Pattern. The communication pattern between processes.')
+    parser.add_argument('--producers', type=int, help='Producers. In mpmc, how many of the processes enqueue; the rest dequeue. Defaults to half.')
+    parser.add_argument('--lock', choices=['spin', 'semaphore', 'mp-lock'], default='spin', help='Lock. In mpmc, the lock guarding each end of the queue: a shared memory spin lock, a posix_ipc semaphore or a multiprocessing.Lock.')
+    parser.add_argument('--backpressure', action='store_true', help='Backpressure. In publish-subscribe, make the publisher wait for the slowest subscriber instead of overrunning it.')
+    parser.add_argument('--worker_model', choices=['process', 'thread', 'asyncio'], default='process', help='Worker Model. Run workers as processes, as threads sharing a process, or as tasks on a shared asyncio event loop.')
+    parser.add_argument('--threads_per_process', type=int, help='Threads per Process. With --worker_model thread, how many workers share each process (defaults to all of them).')
+    parser.add_argument('--tasks_per_loop', type=int, help='Tasks per Loop. With --worker_model asyncio, how many workers share each event loop (defaults to all of them).')
     parser.add_argument('--process_count', type=int, help='Process Count. The number of processes participating in the benchmark.')
+    parser.add_argument('--cpu_list', type=str, help='CPU List. CPUs the workers may run on, e.g. "0-3,8". Defaults to the current affinity.')
+    parser.add_argument('--pin_strategy', choices=['none', 'smt', 'socket', 'cross-socket'], default='none', help='Pin Strategy. Pin communicating workers to SMT siblings of one core, different cores of one socket, or different sockets.')
+    parser.add_argument('--numa_node', type=int, help='NUMA Node. Run the workers on this node and first-touch the shared memory from it.')
     parser.add_argument('--message_count', type=int, help='Message Count. The number of messages to exchange between processes.')
+    parser.add_argument('--histogram_precision', type=int, choices=range(1, 5), default=3, help='Histogram Precision. Significant decimal digits kept by the per-message latency histograms (1-4).')
+    parser.add_argument('--warmup', type=str, help='Warmup. Messages ("1000") or seconds ("2s") per worker measured separately and excluded from the steady-state statistics.')
+    parser.add_argument('--mlock', action='store_true', help='Lock Memory. mlock the pre-faulted shared memory and sample buffers before timing.')
+    parser.add_argument('--verify', action='store_true', help='Verify Payloads. Checksum every received message against the pre-generated payloads and count corrupt ones.')
+    parser.add_argument('--telemetry', action='store_true', help='Live Telemetry. Print per-second latency, Msg/s and throughput while each run is in flight.')
+    parser.add_argument('--telemetry_file', type=str, help='Telemetry File. Rewrite this file every second with live statistics in Prometheus text format.')
+    parser.add_argument('--telemetry_socket', type=str, help='Telemetry Socket. Serve live statistics in Prometheus text format to every client that connects to this Unix socket.')
     parser.add_argument('--human_readable', action='store_true', help='Human-Readable Output Format. Output results in a human-readable format.')
     parser.add_argument('--output_json', action='store_true', help='Output JSON Format. Output results in JSON format.')
+    parser.add_argument('--results_store', type=str, default=CONFIG_DEFAULTS['results_store'], help='Results Store. Append-only binary file that every run adds its options, per-second and per-sample columns and summary to; read it back with "report".')
     parser.add_argument('--runs', type=int, help='Number of Runs. The number of times to run the benchmark with the same configuration.')
 
     args = parser.parse_args()
@@ -397,16 +3206,41 @@ def main():
         print("IPC Benchmark Options:")
         print("--config: Path to the YAML config file. It allows specifying multiple values for each option.")
         print("--yaml: Path to the YAML config file (alternative to --config).")
+        print("--sweep_results: Sweep Results. JSON lines file that records every finished permutation; permutations already in it are skipped, so an interrupted sweep resumes.")
+        print("--sweep_parallel: Parallel Sweep. Run independent permutations side by side on disjoint CPU sets when they fit.")
+        print("--rerun: Rerun. Ignore results already recorded in --sweep_results.")
         print("--data_size: Data Size (in MB). The size of the shared memory.")
         print("--duration: Duration (in seconds). The time to run the benchmark.")
         print("--log_file: Log File. The file to store benchmark logs.")
         print("--posix: Use POSIX Shared Memory. Use POSIX shared memory instead of multiprocessing shared memory.")
+        print("--backing: Backing. What backs the shared memory segment. Choose between 'shm' (multiprocessing shared memory, default), 'posix' (posix_ipc), 'hugetlbfs' (a file on hugetlbfs), 'memfd' and 'file-mmap' (an mmap'd file on tmpfs or disk).")
+        print("--backing_dir: Backing Directory. Where hugetlbfs and file-mmap segments create their file (defaults to /dev/hugepages and the temporary directory).")
+        print("--hugepages: Huge Pages. Back a memfd segment with huge pages (MFD_HUGETLB).")
+        print("--transport: Transport. How messages move between processes. Choose between " + ", ".join(f"'{name}'" for name in TRANSPORTS) + "; defaults to 'shm'.")
         print("--message_size: Message Size (in bytes). The size of each message.")
-        print("--message_pattern: Message Pattern. The communication pattern between processes. Choose between 'request-response' and 'publish-subscribe'.")
+        print("--message_size_sweep: Message Size Sweep. Run every size in start:stop:step (e.g. 64:16M:x2) on one shared segment and report a latency/bandwidth curve with its knees.")
+        print("--message_pattern: Message Pattern. The communication pattern between processes. Choose between 'request-response', 'publish-subscribe' and 'mpmc'.")
+        print("--producers: Producers. In mpmc, how many of the processes enqueue; the rest dequeue. Defaults to half.")
+        print("--lock: Lock. In mpmc, the lock guarding each end of the queue. Choose between 'spin' (shared memory spin lock, default), 'semaphore' (posix_ipc) and 'mp-lock' (multiprocessing.Lock).")
+        print("--backpressure: Backpressure. In publish-subscribe, make the publisher wait for the slowest subscriber instead of overrunning it.")
+        print("--worker_model: Worker Model. Choose between 'process' (default), 'thread' (workers are threads sharing a process) and 'asyncio' (workers are tasks on a shared event loop, over " + ", ".join(ASYNCIO_TRANSPORTS) + ").")
+        print("--threads_per_process: Threads per Process. With --worker_model thread, how many workers share each process (defaults to all of them).")
+        print("--tasks_per_loop: Tasks per Loop. With --worker_model asyncio, how many workers share each event loop (defaults to all of them).")
         print("--process_count: Process Count. The number of processes participating in the benchmark.")
+        print("--cpu_list: CPU List. CPUs the workers may run on, e.g. \"0-3,8\". Defaults to the current affinity.")
+        print("--pin_strategy: Pin Strategy. Choose between 'none', 'smt' (same-core SMT siblings), 'socket' (same socket) and 'cross-socket'.")
+        print("--numa_node: NUMA Node. Run the workers on this node and first-touch the shared memory from it.")
         print("--message_count: Message Count. The number of messages to exchange between processes.")
+        print("--histogram_precision: Histogram Precision. Significant decimal digits kept by the per-message latency histograms (1-4, default 3).")
+        print("--warmup: Warmup. Messages (\"1000\") or seconds (\"2s\") per worker measured separately and excluded from the steady-state statistics.")
+        print("--mlock: Lock Memory. mlock the pre-faulted shared memory and sample buffers before timing.")
+        print("--verify: Verify Payloads. Checksum every received message against the pre-generated payloads and count corrupt ones.")
+        print("--telemetry: Live Telemetry. Print per-second latency, Msg/s and throughput while each run is in flight.")
+        print("--telemetry_file: Telemetry File. Rewrite this file every second with live statistics in Prometheus text format.")
+        print("--telemetry_socket: Telemetry Socket. Serve live statistics in Prometheus text format to every client that connects to this Unix socket.")
         print("--human_readable: Human-Readable Output Format. Output results in a human-readable format.")
         print("--output_json: Output JSON Format. Output results in JSON format.")
+        print("--results_store: Results Store. Append-only binary file that every run adds its options, per-second and per-sample columns and summary to; read it back with \"report\" (default ipc_benchmark_results.bin).")
         print("--runs: Number of Runs. The number of times to run the benchmark with the same configuration.")
         exit()
 
@@ -422,20 +3256,44 @@ def main():
             'duration': [args.duration],
             'log_file': [args.log_file],
             'posix': [args.posix],
+            'backing': [args.backing],
+            'backing_dir': [args.backing_dir],
+            'hugepages': [args.hugepages],
+            'transport': [args.transport],
             'message_size': [args.message_size],
+            'message_size_sweep': [args.message_size_sweep],
             'message_pattern': [args.message_pattern],
+            'backpressure': [args.backpressure],
+            'producers': [args.producers],
+            'lock': [args.lock],
             'process_count': [args.process_count],
+            'worker_model': [args.worker_model],
+            'threads_per_process': [args.threads_per_process],
+            'tasks_per_loop': [args.tasks_per_loop],
+            'cpu_list': [args.cpu_list],
+            'pin_strategy': [args.pin_strategy],
+            'numa_node': [args.numa_node],
             'message_count': [args.message_count],
+            'histogram_precision': [args.histogram_precision],
+            'warmup': [args.warmup],
+            'mlock': [args.mlock],
+            'verify': [args.verify],
+            'telemetry': [args.telemetry],
+            'telemetry_file': [args.telemetry_file],
+            'telemetry_socket': [args.telemetry_socket],
             'human_readable': [args.human_readable],
             'output_json': [args.output_json],
+            'results_store': [args.results_store],
             'runs': [args.runs]
         }
+    for option, value in CONFIG_DEFAULTS.items():
+        config.setdefault(option, [value])
 
-    option_permutations = list(itertools.product(*config.values()))
+    # YAML scalars such as "runs: 3" are single-value options
+    config = {option: value if isinstance(value, list) else [value] for option, value in config.items()}
+    option_permutations = [dict(zip(config.keys(), options)) for options in itertools.product(*config.values())]
 
-    for options in option_permutations:
-        parsed_args = argparse.Namespace(**dict(zip(config.keys(), options)))
-        run_ipc_benchmark(parsed_args)
+    run_sweep(option_permutations, args.sweep_results, args.sweep_parallel, args.rerun)
 
 if __name__ == "__main__":
     main()